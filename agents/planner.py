@@ -4,35 +4,29 @@ Decides which tools to use based on user request.
 This is the original planner from the user's code.
 """
 
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from config import DEFAULT_MODEL
+from services.cassette import cassette
+from services.llm_clients import get_chat_model
+from services.llm_limiter import llm_limiter
+from tools.registry import registry
 
 
 class PlannerAgent:
     """
     Agent that analyzes user requests and creates an execution plan.
-    Decides which tools (writer, calculator, email_sender, reviewer) to use.
+    Decides which tools to use; the tool list comes from the tool registry.
     """
     
     def __init__(self):
-        self.llm = ChatGroq(
-            model_name=DEFAULT_MODEL,
-            temperature=0.3,
-        )
+        self.llm = get_chat_model(temperature=0.3)
         
         self.prompt = ChatPromptTemplate.from_template(
             """
 You are a planning assistant for a WhatsApp AI agent.
 The agent has these tools:
-- writer: writes or rewrites email text or short messages.
-- calculator: does math or numeric calculations.
-- email_sender: sends or schedules emails using a ready email body.
-- reviewer: reviews draft content and decides APPROVE / REVISE_WRITER / REVISE_SEARCHER.
-- search: searches the web for current information.
-- create_document: creates a Word document with content.
+{tool_list}
 
 Create a short ordered plan (1–3 steps) for how the agent should solve the user request.
 
@@ -41,7 +35,7 @@ Return ONLY JSON with this shape:
   "overall_goal": "string",
   "steps": [
     {{
-      "tool": "writer" | "calculator" | "email_sender" | "reviewer" | "search" | "create_document",
+      "tool": {tool_names},
       "description": "string",
       "input": "string"
     }}
@@ -51,6 +45,9 @@ Return ONLY JSON with this shape:
 User request:
 {user_request}
 """
+        ).partial(
+            tool_list=registry.describe_for_prompt(),
+            tool_names=" | ".join(f'"{name}"' for name in registry.names()),
         )
         
         self.chain = self.prompt | self.llm | StrOutputParser()
@@ -65,4 +62,7 @@ User request:
         Returns:
             JSON string with the plan
         """
-        return self.chain.invoke({"user_request": user_request})
+        inputs = {"user_request": user_request}
+        return cassette.call("llm", "planner", inputs, lambda: llm_limiter.call(
+            self.llm.model_name, "interactive", lambda: self.chain.invoke(inputs)
+        ))
@@ -3,11 +3,13 @@ agents/researcher.py - Researcher Agent
 Responsible for gathering and synthesizing information on a topic.
 """
 
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from config import DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from config import DEFAULT_TEMPERATURE
+from services.cassette import cassette
+from services.llm_clients import get_chat_model
+from services.llm_limiter import llm_limiter
 
 
 class ResearcherAgent:
@@ -17,10 +19,7 @@ class ResearcherAgent:
     """
     
     def __init__(self):
-        self.llm = ChatGroq(
-            model_name=DEFAULT_MODEL,
-            temperature=DEFAULT_TEMPERATURE,
-        )
+        self.llm = get_chat_model(temperature=DEFAULT_TEMPERATURE)
         
         self.prompt = ChatPromptTemplate.from_template(
             """You are a thorough research assistant. Your job is to analyze 
@@ -55,7 +54,19 @@ class ResearcherAgent:
         Returns:
             A research summary string
         """
-        return self.chain.invoke({
-            "topic": topic,
-            "search_results": search_results
-        })
+        inputs = {"topic": topic, "search_results": search_results}
+        return cassette.call("llm", "researcher", inputs, lambda: llm_limiter.call(
+            self.llm.model_name, "bulk", lambda: self.chain.invoke(inputs)
+        ))
+    
+    def stream_research(self, topic: str, search_results: str = ""):
+        """
+        Same as research(), but yields the summary piece by piece as it is generated.
+        
+        Yields:
+            Chunks of the research summary
+        """
+        inputs = {"topic": topic, "search_results": search_results}
+        yield from cassette.stream("llm", "researcher", inputs, lambda: llm_limiter.stream(
+            self.llm.model_name, "bulk", lambda: self.chain.stream(inputs)
+        ))
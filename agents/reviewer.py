@@ -4,11 +4,25 @@ Reviews draft content and decides if it should be approved or revised.
 This is the original reviewer from the user's code.
 """
 
-from langchain_groq import ChatGroq
+import re
+from collections import Counter
+from typing import Literal
+
+from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 
-from config import DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from config import DEFAULT_TEMPERATURE, REVIEW_MIN_CHARS, REVIEW_MAX_CHARS
+from services.cassette import cassette
+from services.llm_clients import get_chat_model
+from services.llm_limiter import llm_limiter
+
+
+class ReviewDecision(BaseModel):
+    """Structured output returned by the reviewer LLM."""
+    decision: Literal["APPROVE", "REVISE_WRITER", "REVISE_SEARCHER"] = Field(
+        description="The editorial decision for the draft"
+    )
+    reason: str = Field(description="Concise reason for the decision")
 
 
 class ReviewerAgent:
@@ -18,19 +32,14 @@ class ReviewerAgent:
     """
     
     def __init__(self):
-        self.llm = ChatGroq(
-            model_name=DEFAULT_MODEL,
-            temperature=DEFAULT_TEMPERATURE,
-        )
+        self.llm = get_chat_model(temperature=DEFAULT_TEMPERATURE)
         
         self.prompt = ChatPromptTemplate.from_template(
             """You are a pragmatic editor. Your goal is to ensure an article is factually correct,
 coherent, and reasonably comprehensive. Do not aim for perfection.
 
 Review the draft based on the topic. Your decision MUST be one of three choices:
-'DECISION: APPROVE'
-'DECISION: REVISE_WRITER'
-'DECISION: REVISE_SEARCHER'
+APPROVE, REVISE_WRITER or REVISE_SEARCHER
 
 Follow these rules:
 1. If the article is well-written and covers the main points of the topic, APPROVE it.
@@ -39,17 +48,15 @@ Follow these rules:
 3. If the article lacks key information or seems factually thin,
    choose REVISE_SEARCHER.
 
-Provide a concise reason for your decision, then end with the required DECISION line.
+Provide the decision and a concise reason for it.
 
 Topic: {topic}
 Draft Article:
 {draft}
-
-Your Critique:
 """
         )
         
-        self.chain = self.prompt | self.llm | StrOutputParser()
+        self.chain = self.prompt | self.llm.with_structured_output(ReviewDecision)
     
     def review(self, topic: str, draft: str) -> dict:
         """
@@ -62,19 +69,63 @@ Your Critique:
         Returns:
             Dict with 'decision' and 'reason' keys
         """
-        response_text = self.chain.invoke({"topic": topic, "draft": draft})
-        
-        # Parse the decision from the response
-        decision = "UNKNOWN"
-        for line in response_text.splitlines():
-            line = line.strip()
-            if line.startswith("DECISION:"):
-                decision = line.replace("DECISION:", "").strip()
-                break
-        
-        reason = response_text.replace(f"DECISION: {decision}", "").strip()
-        
+        inputs = {"topic": topic, "draft": draft}
+        return cassette.call("llm", "reviewer", inputs, lambda: self._review(inputs))
+    
+    def _review(self, inputs: dict) -> dict:
+        result = llm_limiter.call(self.llm.model_name, "interactive", lambda: self.chain.invoke(inputs))
         return {
-            "decision": decision,
-            "reason": reason
+            "decision": result.decision,
+            "reason": result.reason
         }
+
+
+# =============================================================================
+# LOCAL PRE-CHECKS
+# =============================================================================
+
+def _salient_terms(text: str, limit: int = 10) -> list:
+    """Pick the most frequent numbers and capitalized words from search results."""
+    lines = [line for line in text.splitlines() if "Source:" not in line]
+    words = re.findall(r"\b(?:\d[\d,.]*\d|[A-Z][a-zA-Z]{3,})\b", "\n".join(lines))
+    return [word.lower() for word, _ in Counter(words).most_common(limit)]
+
+
+def local_precheck(draft: str, search_context: str = "") -> tuple:
+    """
+    Cheap heuristic checks run before the reviewer LLM.
+    Drafts that pass every check are approved without an LLM call.
+    
+    Args:
+        draft: The draft content to check
+        search_context: Search results the draft should draw on (if any)
+        
+    Returns:
+        (passed, problems) where problems is a list of short descriptions
+    """
+    problems = []
+    text = draft.strip()
+    
+    # Length
+    if len(text) < REVIEW_MIN_CHARS:
+        problems.append("draft is too short")
+    elif len(text) > REVIEW_MAX_CHARS:
+        problems.append("draft is too long")
+    
+    # Structure: a few complete sentences and no cut-off ending
+    # (a short last line is allowed for sign-offs like "Best regards,\nSam")
+    if len(re.findall(r"[.!?](?:\s|$)", text)) < 2:
+        problems.append("draft has no clear sentence structure")
+    last_line = text.splitlines()[-1].strip() if text else ""
+    if last_line and len(last_line) > 40 and last_line[-1] not in ".!?)\"'*":
+        problems.append("draft looks truncated")
+    
+    # Search facts should show up in the draft
+    if search_context:
+        terms = _salient_terms(search_context)
+        lowered = text.lower()
+        found = sum(1 for term in terms if term in lowered)
+        if terms and found < min(3, len(terms)):
+            problems.append("draft does not use the search results")
+    
+    return (not problems, problems)
@@ -3,11 +3,13 @@ agents/writer.py - Writer Agent
 Responsible for creating polished written content.
 """
 
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from config import DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from config import DEFAULT_TEMPERATURE
+from services.cassette import cassette
+from services.llm_clients import get_chat_model
+from services.llm_limiter import llm_limiter
 
 
 class WriterAgent:
@@ -17,10 +19,7 @@ class WriterAgent:
     """
     
     def __init__(self):
-        self.llm = ChatGroq(
-            model_name=DEFAULT_MODEL,
-            temperature=0.3,  # Slightly more creative for writing
-        )
+        self.llm = get_chat_model(temperature=0.3)  # Slightly more creative for writing
         
         self.prompt = ChatPromptTemplate.from_template(
             """You are a skilled writer. Your job is to create clear, engaging,
@@ -50,11 +49,22 @@ class WriterAgent:
         Returns:
             The written content
         """
-        return self.chain.invoke({
-            "task": task,
-            "content": content,
-            "instructions": instructions
-        })
+        inputs = {"task": task, "content": content, "instructions": instructions}
+        return cassette.call("llm", "writer", inputs, lambda: llm_limiter.call(
+            self.llm.model_name, "bulk", lambda: self.chain.invoke(inputs)
+        ))
+    
+    def stream_write(self, task: str, content: str, instructions: str = ""):
+        """
+        Same as write(), but yields the text piece by piece as it is generated.
+        
+        Yields:
+            Chunks of the written content
+        """
+        inputs = {"task": task, "content": content, "instructions": instructions}
+        yield from cassette.stream("llm", "writer", inputs, lambda: llm_limiter.stream(
+            self.llm.model_name, "bulk", lambda: self.chain.stream(inputs)
+        ))
     
     def rewrite(self, original: str, feedback: str) -> str:
         """
@@ -80,4 +90,27 @@ class WriterAgent:
             """
         )
         chain = rewrite_prompt | self.llm | StrOutputParser()
-        return chain.invoke({"original": original, "feedback": feedback})
+        inputs = {"original": original, "feedback": feedback}
+        return cassette.call("llm", "writer.rewrite", inputs, lambda: llm_limiter.call(
+            self.llm.model_name, "bulk", lambda: chain.invoke(inputs)
+        ))
+
+
+def run_step(step: dict, context: dict) -> str:
+    """
+    Executor step handler: write content for the step.
+    Streams tokens to context["reply_sink"] when one is given.
+    """
+    writer = WriterAgent()
+    task = step.get("description", "write")
+    content = step.get("input", "")
+    
+    reply_sink = context.get("reply_sink")
+    if reply_sink:
+        parts = []
+        for token in writer.stream_write(task=task, content=content, instructions=""):
+            reply_sink(token)
+            parts.append(token)
+        return "".join(parts)
+    
+    return writer.write(task=task, content=content, instructions="")
@@ -0,0 +1,142 @@
+"""
+bench_email.py - Email Engine Benchmark
+Sends emails through the outbound email engine to a local SMTP sink and
+reports messages per second end to end (enqueue → 250 OK from the server).
+The sink can add per-message latency, reject addresses that start with
+"bad" (550, permanent) and answer a fraction of messages with 451 (temporary).
+
+Usage (from project root, with venv activated):
+    python bench_email.py                                   # 2,000 emails over 20 domains
+    python bench_email.py --emails 10000 --pool 4 --latency-ms 5 --temp-error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+
+
+class SMTPSink:
+    """Minimal SMTP server on asyncio that accepts (and counts) every message."""
+
+    def __init__(self, latency_ms: float = 0.0, temp_error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.temp_error_rate = temp_error_rate
+        self.accepted = 0
+        self.rejected = 0
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        writer.write(b"220 sink ESMTP\r\n")
+        refused = False
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                writer.write(b"250-sink\r\n250 SIZE 10485760\r\n")
+            elif command.startswith("RCPT TO:"):
+                refused = "<BAD" in command
+                writer.write(b"550 5.1.1 No such user\r\n" if refused else b"250 OK\r\n")
+            elif command == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                while (await reader.readline()) not in (b".\r\n", b""):
+                    pass
+                await asyncio.sleep(self.latency_ms / 1000)
+                if random.random() < self.temp_error_rate:
+                    self.rejected += 1
+                    writer.write(b"451 4.3.0 Try again later\r\n")
+                else:
+                    self.accepted += 1
+                    writer.write(b"250 OK queued\r\n")
+            elif command == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:  # HELO, MAIL FROM, RSET, NOOP
+                if command == "RSET" and refused:
+                    self.rejected += 1
+                    refused = False
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def serve(self) -> int:
+        """Start the sink on a free local port in a daemon thread and return the port."""
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        ready = threading.Event()
+
+        async def run():
+            await asyncio.start_server(self.handle, "127.0.0.1", port)
+            ready.set()
+            await asyncio.Event().wait()
+
+        threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+        ready.wait()
+        return port
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the email engine against a local SMTP sink.")
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--domains", type=int, default=20, help="recipient domains to spread emails over")
+    parser.add_argument("--domain-rate", type=float, default=1000, help="EMAIL_DOMAIN_RATE for the run")
+    parser.add_argument("--pool", type=int, default=2, help="EMAIL_POOL_SIZE (connections and workers)")
+    parser.add_argument("--batch", type=int, default=20, help="EMAIL_BATCH_SIZE")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="sink time per message")
+    parser.add_argument("--temp-error-rate", type=float, default=0.0, help="fraction of 451 replies")
+    parser.add_argument("--invalid", type=float, default=0.0, help="fraction of unknown mailboxes (550)")
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.latency_ms, args.temp_error_rate)
+    port = sink.serve()
+
+    # Settings are read on import, so set them first
+    os.environ.update({
+        "EMAIL_DOMAIN_RATE": str(args.domain_rate),
+        "EMAIL_RETRY_BASE_SECONDS": "0.1",
+        "STATE_BACKEND": "memory",
+    })
+    from services.email_engine import EmailEngine, SMTPConnectionPool
+
+    engine = EmailEngine(
+        pool=SMTPConnectionPool(host="127.0.0.1", port=port, size=args.pool, username="", starttls=False),
+        workers=args.pool, batch_size=args.batch, sender="bench@example.com",
+    )
+
+    started = time.perf_counter()
+    ids = [
+        engine.enqueue(
+            to=f"{'bad' if random.random() < args.invalid else 'user'}{n}@domain{n % args.domains}.test",
+            subject=f"Benchmark {n}",
+            body="Hello from the email engine benchmark.\n" * 5,
+        )
+        for n in range(args.emails)
+    ]
+    enqueued = time.perf_counter() - started
+    drained = engine.drain(timeout=600)
+    elapsed = time.perf_counter() - started
+
+    statuses = [engine.status(message_id)["status"] for message_id in ids]
+    stats = engine.stats()
+    print(f"📊 Email engine benchmark ({args.emails:,} emails, pool {args.pool}, batch {args.batch}, "
+          f"sink latency {args.latency_ms:g} ms)")
+    print(f"   sent / failed:         {statuses.count('sent'):,} / {statuses.count('failed'):,}"
+          f"{'' if drained else ' (timed out)'}")
+    print(f"   messages per second:   {statuses.count('sent') / elapsed:,.1f}")
+    print(f"   enqueue time:          {enqueued * 1000:.0f} ms ({args.emails / enqueued:,.0f}/s)")
+    print(f"   SMTP connections:      {stats['connections_opened']} opened, {sink.connections} seen by sink")
+    print(f"   sink accepted / 4xx-5xx: {sink.accepted:,} / {sink.rejected:,}")
+    print(f"   wall time:             {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+bench_llm_limiter.py - LLM Limiter Check
+Runs real PlannerAgent / WriterAgent calls against a local fake Groq API that
+only serves `--capacity` requests at once and answers 429 (Retry-After) above
+that. Long writer generations run in the background while short planner
+calls measure how long interactive requests wait.
+
+Usage (from project root, with venv activated):
+    python bench_llm_limiter.py
+    python bench_llm_limiter.py --capacity 4 --writers 24 --seconds 30
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def fake_groq(capacity: int, writer_seconds: float, planner_seconds: float) -> FastAPI:
+    """OpenAI-style chat completions endpoint with a hard concurrency cap."""
+    app = FastAPI()
+    app.state.in_flight = 0
+    app.state.served = 0
+    app.state.rejected = 0
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        if app.state.in_flight >= capacity:
+            app.state.rejected += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429, headers={"retry-after": "1"},
+            )
+
+        app.state.in_flight += 1
+        try:
+            planning = "planning assistant" in prompt
+            await asyncio.sleep(planner_seconds if planning else writer_seconds)
+        finally:
+            app.state.in_flight -= 1
+        app.state.served += 1
+
+        text = '{"overall_goal": "x", "steps": []}' if planning else "A short written answer."
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", ""),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the adaptive LLM limiter against a fake Groq.")
+    parser.add_argument("--capacity", type=int, default=6, help="requests the fake Groq serves at once")
+    parser.add_argument("--writers", type=int, default=16, help="threads making writer calls in a loop")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--writer-latency", type=float, default=1.0)
+    parser.add_argument("--planner-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # config.py copies GROQ_API_KEY into the environment on import, so set a
+    # placeholder first, and GROQ_API_BASE before any ChatGroq is created
+    os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY") or "fake"
+    from bench_broadcast import serve
+
+    app = fake_groq(args.capacity, args.writer_latency, args.planner_latency)
+    port = serve(app)
+    os.environ["GROQ_API_BASE"] = f"http://127.0.0.1:{port}"
+
+    from agents.planner import PlannerAgent
+    from agents.writer import WriterAgent
+    from services.llm_limiter import llm_limiter
+
+    stop = time.monotonic() + args.seconds
+    outcomes = {"writer_ok": 0, "writer_failed": 0, "planner_failed": 0}
+    planner_latency = []
+    lock = threading.Lock()
+
+    def writer_loop():
+        writer = WriterAgent()
+        while time.monotonic() < stop:
+            try:
+                writer.write(task="note", content="benchmark")
+                key = "writer_ok"
+            except Exception:
+                key = "writer_failed"
+            with lock:
+                outcomes[key] += 1
+
+    def planner_loop():
+        planner = PlannerAgent()
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            try:
+                planner.create_plan("What's new?")
+                with lock:
+                    planner_latency.append(time.perf_counter() - started)
+            except Exception:
+                with lock:
+                    outcomes["planner_failed"] += 1
+            time.sleep(0.2)
+
+    threads = [threading.Thread(target=writer_loop) for _ in range(args.writers)]
+    threads.append(threading.Thread(target=planner_loop))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = next(iter(llm_limiter.stats().values()))
+    quantiles = statistics.quantiles(planner_latency, n=20) if len(planner_latency) > 1 else [0] * 19
+    print(f"📊 LLM limiter ({args.writers} writer threads, fake Groq capacity {args.capacity})")
+    print(f"   writer calls ok / failed:   {outcomes['writer_ok']} / {outcomes['writer_failed']}")
+    print(f"   planner calls ok / failed:  {len(planner_latency)} / {outcomes['planner_failed']}")
+    print(f"   planner latency p50 / p95:  {statistics.median(planner_latency or [0]):.2f}s / {quantiles[18]:.2f}s")
+    print(f"   server served / 429s:       {app.state.served} / {app.state.rejected}")
+    print(f"   final limit:                {stats['limit']} (throttled {stats['throttled']}, "
+          f"timeouts {stats['timeouts']})")
+
+
+if __name__ == "__main__":
+    main()
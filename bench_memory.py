@@ -0,0 +1,165 @@
+"""
+bench_memory.py - Memory Budget Check
+Runs N conversations at once through run_workflow against local stand-ins
+for Groq and Tavily (search → writer plans with realistic dump and draft
+sizes) and checks peak RSS growth, and optionally the tracemalloc peak,
+against a budget. Exits with status 1 when a budget is exceeded, a
+conversation gets no reply or the searches did not reach the stand-in.
+
+Usage (from project root, with venv activated):
+    python bench_memory.py                                # 200 conversations, 200 MB RSS budget
+    python bench_memory.py --conversations 500 --budget-mb 400 --alloc-budget-mb 250
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from fastapi import FastAPI, Request
+
+# Words the writer stand-in repeats from the search dump, so drafts pass the local review checks
+FACTS = "Starship Flight 2026 reached orbit after the Booster Catch at Starbase. "
+
+
+def fake_apis(search_kb: float, draft_kb: float, latency_ms: float) -> FastAPI:
+    """Groq chat completions (planner/writer) and Tavily search, with fixed output sizes."""
+    app = FastAPI()
+    app.state.searches = 0
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        await asyncio.sleep(latency_ms / 1000)
+        if "planning assistant" in prompt:
+            request_text = prompt.rsplit("User request:", 1)[-1].strip()
+            text = json.dumps({"overall_goal": request_text, "steps": [
+                {"tool": "search", "description": "find the news", "input": request_text},
+                {"tool": "writer", "description": "summarize it", "input": "summarize the search results"},
+            ]})
+        else:
+            text = (FACTS * int(draft_kb * 1024 / len(FACTS) + 1))[:int(draft_kb * 1024)].rsplit(".", 1)[0] + "."
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", ""),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await request.json()
+        app.state.searches += 1
+        await asyncio.sleep(latency_ms / 1000)
+        results = body.get("max_results", 5)
+        content = f"{body['query']}: " + FACTS * int(search_kb * 1024 / results / len(FACTS) + 1)
+        return {"query": body["query"], "results": [
+            {"title": f"Result {n}", "url": f"https://example.com/{n}", "content": content}
+            for n in range(results)
+        ]}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check memory use of concurrent conversations.")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--search-kb", type=float, default=20, help="size of each search dump")
+    parser.add_argument("--draft-kb", type=float, default=5, help="size of each writer draft")
+    parser.add_argument("--latency-ms", type=float, default=50, help="stand-in API response time")
+    parser.add_argument("--budget-mb", type=float, default=200, help="allowed peak RSS growth")
+    parser.add_argument("--alloc-budget-mb", type=float, default=0,
+                        help="allowed tracemalloc peak (0 = do not trace; tracing is slow)")
+    args = parser.parse_args()
+
+    # bench_broadcast.serve() does not load config.py, so the stand-ins can
+    # start first; settings are read on import, so set them all before any
+    # project module is imported
+    from bench_broadcast import serve
+
+    apis = fake_apis(args.search_kb, args.draft_kb, args.latency_ms)
+    port = serve(apis)
+    tmp = tempfile.mkdtemp()
+    os.environ.update({
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY") or "fake",
+        "TAVILY_API_KEY": os.environ.get("TAVILY_API_KEY") or "fake",
+        "GROQ_API_BASE": f"http://127.0.0.1:{port}",
+        "TAVILY_API_BASE": f"http://127.0.0.1:{port}",
+        "CHECKPOINT_DB_PATH": os.path.join(tmp, "checkpoints.sqlite"),
+        "STATE_BACKEND": "memory",
+    })
+
+    from services.memory import rss_kb
+    from workflows.research_flow import run_workflow
+
+    # Warm up imports, clients and pools so they are not counted against the budget
+    for n in range(3):
+        run_workflow(f"Warm-up news {n}")
+    baseline = rss_kb()["rss_kb"]
+    if args.alloc_budget_mb:
+        tracemalloc.start()
+
+    searches = apis.state.searches
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], rss_kb()["rss_kb"])
+            time.sleep(0.02)
+
+    replies = [None] * args.conversations
+    start = threading.Barrier(args.conversations)
+
+    def conversation(n: int):
+        start.wait()
+        replies[n] = run_workflow(f"What is the latest news on launch {n}?", thread_id=f"bench-{n}")
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    threads = [threading.Thread(target=conversation, args=(n,)) for n in range(args.conversations)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+
+    growth_mb = (peak[0] - baseline) / 1024
+    alloc_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024 if args.alloc_budget_mb else None
+    failed = sum(1 for reply in replies if not reply or reply.startswith(("Sorry", "No response")))
+
+    print(f"📊 Memory check ({args.conversations} concurrent conversations, "
+          f"{args.search_kb:g} KB search dumps, {args.draft_kb:g} KB drafts)")
+    print(f"   replies ok / failed:   {args.conversations - failed} / {failed}")
+    print(f"   searches served:       {apis.state.searches - searches}")
+    print(f"   peak RSS growth:       {growth_mb:.1f} MB (budget {args.budget_mb:g} MB, "
+          f"{growth_mb * 1024 / args.conversations:.0f} KB per conversation)")
+    if alloc_mb is not None:
+        print(f"   tracemalloc peak:      {alloc_mb:.1f} MB (budget {args.alloc_budget_mb:g} MB)")
+    print(f"   wall time:             {elapsed:.2f}s")
+
+    over = growth_mb > args.budget_mb or (alloc_mb is not None and alloc_mb > args.alloc_budget_mb)
+    missed = apis.state.searches - searches < args.conversations
+    if failed or over or missed:
+        if over:
+            print("❌ Memory budget exceeded")
+        elif failed:
+            print("❌ Some conversations got no reply")
+        else:
+            print("❌ Searches did not reach the stand-in, search dumps were not exercised")
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+bench_scheduler.py - Scheduler Benchmark
+Measures insert throughput (single and batched), fire throughput with a
+no-op sender, restart reload time and the idle cost of a large backlog.
+Uses a throwaway database; nothing is sent anywhere.
+
+Usage (from project root, with venv activated):
+    python bench_scheduler.py                    # 200,000 pending jobs
+    python bench_scheduler.py --jobs 500000 --fire 50000
+"""
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+from services.scheduler import Scheduler
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:,.0f}/s" if seconds else "n/a"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the deferred message scheduler.")
+    parser.add_argument("--jobs", type=int, default=200_000, help="future jobs to keep pending")
+    parser.add_argument("--single", type=int, default=10_000, help="jobs inserted one at a time")
+    parser.add_argument("--fire", type=int, default=20_000, help="jobs that fire during the run")
+    parser.add_argument("--batch", type=int, default=1000, help="schedule_many() batch size")
+    args = parser.parse_args()
+
+    noop = {"whatsapp": lambda payload: None}
+    sent = []
+    counting = {"whatsapp": lambda payload: sent.append(payload["n"])}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite")
+        scheduler = Scheduler(path, senders=noop, horizon=24 * 3600, refill_interval=3600)
+        scheduler.start()
+        now = time.time()
+        payload = {"to": "whatsapp:+10000000000", "body": "⏰ Reminder: benchmark"}
+
+        # Single inserts (one transaction each, dispatcher running)
+        started = time.perf_counter()
+        for _ in range(args.single):
+            scheduler.schedule("whatsapp", payload, now + random.uniform(3600, 30 * 86400))
+        single = time.perf_counter() - started
+
+        # Batched inserts spread over the next 30 days (most outside the horizon)
+        started = time.perf_counter()
+        remaining = args.jobs - args.single
+        while remaining > 0:
+            size = min(args.batch, remaining)
+            scheduler.schedule_many([
+                ("whatsapp", payload, now + random.uniform(3600, 30 * 86400)) for _ in range(size)
+            ])
+            remaining -= size
+        batched = time.perf_counter() - started
+        time.sleep(0.5)  # let the dispatcher absorb the in-horizon jobs
+
+        # Idle cost: CPU used by the process while nothing is due
+        cpu_before = time.process_time()
+        time.sleep(2)
+        idle_cpu = time.process_time() - cpu_before
+
+        # Fire throughput: jobs due now, on a fresh scheduler with a counting sender
+        firing = Scheduler(path, senders=counting, horizon=60, refill_interval=3600)
+        firing.schedule_many([
+            ("whatsapp", {**payload, "n": n}, time.time() - 1) for n in range(args.fire)
+        ])
+        started = time.perf_counter()
+        firing.start()
+        while len(sent) < args.fire and time.perf_counter() - started < 120:
+            time.sleep(0.01)
+        fired = time.perf_counter() - started
+
+        # Restart: a new process loading the in-horizon part of the backlog
+        stats = scheduler.stats()
+        started = time.perf_counter()
+        reloaded = Scheduler(path, senders=noop, horizon=24 * 3600, refill_interval=3600)
+        reloaded.start()
+        while reloaded.stats()["in_memory"] < stats["in_memory"] and time.perf_counter() - started < 60:
+            time.sleep(0.001)
+        reload = time.perf_counter() - started
+
+        print(f"📊 Scheduler benchmark ({args.jobs:,} pending jobs)")
+        print(f"   insert, one per transaction: {rate(args.single, single)}")
+        print(f"   insert, batches of {args.batch}:   {rate(args.jobs - args.single, batched)}")
+        print(f"   fire (no-op sender):         {rate(len(sent), fired)} ({len(sent):,} jobs)")
+        print(f"   restart reload:              {reload * 1000:.0f} ms ({stats['in_memory']:,} jobs in horizon)")
+        print(f"   idle CPU over 2s:            {idle_cpu * 1000:.1f} ms")
+        print(f"   in memory / pending:         {stats['in_memory']:,} / {stats['pending']:,}")
+        print(f"   peak RSS:                    {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+bench_state_backend.py - State Backend Benchmark
+Runs 1..N worker processes against each state backend with a tool-cache
+style workload: look a key up, store it on a miss (as invoke() does for
+cacheable tools), and bump a per-domain rate counter. Reports the cache hit
+rate, operations per second and get/incr latency as workers are added.
+A process-local backend fragments the cache; shared backends do not.
+
+The redis backend runs against a local fakeredis TCP server, or against
+--redis-url when given.
+
+Usage (from project root, with venv activated):
+    python bench_state_backend.py                          # 1, 2, 4 workers
+    python bench_state_backend.py --workers 1 2 4 8 --ops 20000 --backends sqlite redis
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+# Check if fakeredis is available (only needed without --redis-url)
+try:
+    import fakeredis
+    FAKEREDIS_AVAILABLE = True
+except ImportError:
+    FAKEREDIS_AVAILABLE = False
+
+
+def worker(kind: str, options: dict, ops: int, keys: int, seed: int, start, results) -> None:
+    """One worker process: `ops` cache lookups plus rate-limit increments."""
+    from services.state_backend import MemoryBackend, RedisBackend, SQLiteBackend
+
+    if kind == "memory":
+        backend = MemoryBackend()
+    elif kind == "sqlite":
+        backend = SQLiteBackend(options["path"])
+    else:
+        backend = RedisBackend(options["url"])
+
+    rng = random.Random(seed)
+    # Skewed key popularity, like repeated searches for the same news
+    weights = [1 / (rank + 1) for rank in range(keys)]
+    lookups = rng.choices(range(keys), weights=weights, k=ops)
+
+    hits = 0
+    get_latency, incr_latency = [], []
+    start.wait()
+    started = time.perf_counter()
+    for n, key in enumerate(lookups):
+        t0 = time.perf_counter()
+        value = backend.get(f"tool:search:{key}")
+        get_latency.append(time.perf_counter() - t0)
+        if value is None:
+            backend.set(f"tool:search:{key}", "result " * 20, ttl=300)
+        else:
+            hits += 1
+
+        t0 = time.perf_counter()
+        backend.incr(f"email:rate:domain{n % 10}:{int(time.time())}", ttl=2)
+        incr_latency.append(time.perf_counter() - t0)
+    results.put({
+        "hits": hits,
+        "ops": ops,
+        "seconds": time.perf_counter() - started,
+        "get": get_latency,
+        "incr": incr_latency,
+    })
+
+
+def run(kind: str, options: dict, workers: int, ops: int, keys: int) -> dict:
+    """Run `workers` processes at once and merge their results."""
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(kind, options, ops, keys, seed, start, results))
+        for seed in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)  # let every worker import and connect before the clock starts
+    start.set()
+    merged = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    get_latency = sorted(x for r in merged for x in r["get"])
+    incr_latency = sorted(x for r in merged for x in r["incr"])
+    total_ops = sum(r["ops"] for r in merged)
+    return {
+        "hit_rate": sum(r["hits"] for r in merged) / total_ops,
+        "ops_per_second": total_ops / max(r["seconds"] for r in merged),
+        "get_p50_us": statistics.median(get_latency) * 1e6,
+        "get_p99_us": get_latency[int(len(get_latency) * 0.99)] * 1e6,
+        "incr_p50_us": statistics.median(incr_latency) * 1e6,
+    }
+
+
+def fake_redis_url() -> str:
+    """Start a fakeredis TCP server in a daemon thread and return its URL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    class Server(fakeredis.TcpFakeServer):
+        def get_request(self):
+            # The fake writes each pipelined reply separately; without NODELAY
+            # every incr() pays a delayed-ACK stall that a real Redis does not
+            conn, address = super().get_request()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return conn, address
+
+    server = Server(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the shared state backends with 1..N workers.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--ops", type=int, default=5000, help="cache lookups per worker")
+    parser.add_argument("--keys", type=int, default=2000, help="distinct cache keys")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite", "redis"])
+    parser.add_argument("--redis-url", default="", help="real Redis server (default: local fakeredis)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as tmp:
+        print(f"📊 State backend benchmark ({args.ops:,} lookups per worker over {args.keys:,} keys)")
+        print(f"   {'backend':<8} {'workers':>7} {'hit rate':>9} {'ops/s':>9} "
+              f"{'get p50':>9} {'get p99':>9} {'incr p50':>9}")
+        for kind in args.backends:
+            if kind == "redis" and not args.redis_url and not FAKEREDIS_AVAILABLE:
+                print("   redis    skipped (pip install fakeredis, or pass --redis-url)")
+                continue
+            for workers in args.workers:
+                # A fresh store per run, so hit rates start from a cold cache
+                if kind == "sqlite":
+                    options = {"path": os.path.join(tmp, f"state-{workers}.sqlite")}
+                elif kind == "redis":
+                    options = {"url": args.redis_url or fake_redis_url()}
+                    if args.redis_url:
+                        from services.state_backend import RedisBackend
+                        RedisBackend(args.redis_url).client.flushdb()
+                else:
+                    options = {}
+                r = run(kind, options, workers, args.ops, args.keys)
+                print(f"   {kind:<8} {workers:>7} {r['hit_rate']:>8.1%} {r['ops_per_second']:>9,.0f} "
+                      f"{r['get_p50_us']:>7.0f}µs {r['get_p99_us']:>7.0f}µs {r['incr_p50_us']:>7.0f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+bench_worker.py - Worker Throughput Benchmark
+Queues WhatsApp jobs and drains them with 1..N `worker.py --drain` processes,
+against local stand-ins for Groq, Tavily and the Twilio Messages API.
+Reports jobs per second for each process count.
+
+Usage (from project root, with venv activated):
+    python bench_worker.py                                 # 200 jobs with 1, 2 and 4 workers
+    python bench_worker.py --jobs 500 --workers 1 2 4 8 --concurrency 8 --latency-ms 300
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_broadcast import fake_twilio, serve
+from bench_memory import fake_apis
+from services.job_queue import JobQueue
+
+WORKER_LINE = re.compile(r"(\d+) jobs done, (\d+) failed in ([\d.]+)s")
+
+
+def run(workers: int, jobs: int, concurrency: int, env: dict) -> dict:
+    """Queue `jobs` jobs, drain them with `workers` processes and collect their stats."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **env,
+            "JOB_QUEUE_PATH": os.path.join(tmp, "jobs.sqlite"),
+            "CHECKPOINT_DB_PATH": os.path.join(tmp, "checkpoints.sqlite"),
+        }
+        queue = JobQueue(env["JOB_QUEUE_PATH"])
+        for n in range(jobs):
+            queue.enqueue({"to": f"whatsapp:+1{n:010d}", "body": f"What is the latest news on launch {n}?",
+                           "thread_id": f"bench-{workers}-{n}"})
+
+        started = time.perf_counter()
+        processes = [
+            subprocess.Popen([sys.executable, "worker.py", "--drain", "--concurrency", str(concurrency)],
+                             env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            for _ in range(workers)
+        ]
+        outputs = [process.communicate()[0] for process in processes]
+        elapsed = time.perf_counter() - started
+
+        done = failed = 0
+        for output in outputs:
+            match = WORKER_LINE.search(output)
+            if match:
+                done += int(match.group(1))
+                failed += int(match.group(2))
+        return {"done": done, "failed": failed, "elapsed": elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark jobs/s with 1..N worker processes.")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs per worker process at once")
+    parser.add_argument("--latency-ms", type=float, default=200, help="stand-in Groq/Tavily response time")
+    args = parser.parse_args()
+
+    app = fake_twilio(provider_rate=10_000, latency_ms=20, error_rate=0.0)
+    app.include_router(fake_apis(search_kb=5, draft_kb=2, latency_ms=args.latency_ms).router)
+    base = f"http://127.0.0.1:{serve(app)}"
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.getcwd(),
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY") or "fake",
+        "TAVILY_API_KEY": os.environ.get("TAVILY_API_KEY") or "fake",
+        "GROQ_API_BASE": base,
+        "TAVILY_API_BASE": base,
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": "secret",
+        "TWILIO_API_BASE": base,
+        "STATE_BACKEND": "memory",
+        "SCHEDULER_ENABLED": "false",
+        "STREAMING_REPLIES": "false",
+    }
+
+    print(f"📊 Worker benchmark ({args.jobs} jobs, concurrency {args.concurrency} per process, "
+          f"stand-in API latency {args.latency_ms:g} ms)")
+    print(f"   {'workers':>7} {'done':>6} {'failed':>6} {'wall':>8} {'jobs/s':>8} {'messages':>9}")
+    for workers in args.workers:
+        received = app.state.received
+        r = run(workers, args.jobs, args.concurrency, env)
+        print(f"   {workers:>7} {r['done']:>6} {r['failed']:>6} {r['elapsed']:>7.1f}s "
+              f"{r['done'] / r['elapsed']:>8.2f} {app.state.received - received:>9}")
+
+
+if __name__ == "__main__":
+    main()
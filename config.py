@@ -15,6 +15,7 @@ load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "")
+TAVILY_API_BASE = os.getenv("TAVILY_API_BASE", "https://api.tavily.com")  # e.g. a local stand-in for benchmarks
 
 # Set for LangChain
 os.environ["GROQ_API_KEY"] = GROQ_API_KEY
@@ -27,6 +28,52 @@ os.environ["TAVILY_API_KEY"] = TAVILY_API_KEY
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 os.environ["TELEGRAM_BOT_TOKEN"] = TELEGRAM_BOT_TOKEN
 
+# =============================================================================
+# TWILIO / WHATSAPP SETTINGS
+# =============================================================================
+
+# Needed only for outbound (REST) messages; webhook replies use TwiML
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
+TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM", "whatsapp:+14155238886")
+
+# Twilio rejects WhatsApp bodies longer than this
+WHATSAPP_MAX_CHARS = int(os.getenv("WHATSAPP_MAX_CHARS", "1600"))
+
+# Stream long replies as several messages while they are generated
+STREAMING_REPLIES = os.getenv("STREAMING_REPLIES", "false").lower() == "true"
+# Don't send a streamed chunk smaller than this unless it is the last one
+STREAM_MIN_CHUNK_CHARS = int(os.getenv("STREAM_MIN_CHUNK_CHARS", "200"))
+
+# REST API root for outbound messages and broadcasts (one announcement to many contacts)
+TWILIO_API_BASE = os.getenv("TWILIO_API_BASE", "https://api.twilio.com")
+BROADCAST_DB_PATH = os.getenv("BROADCAST_DB_PATH", "broadcasts.sqlite")
+# Messages per second allowed by the WhatsApp sender (Twilio queues anything above it)
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "80"))
+BROADCAST_CONNECTIONS = int(os.getenv("BROADCAST_CONNECTIONS", "20"))
+BROADCAST_MAX_ATTEMPTS = int(os.getenv("BROADCAST_MAX_ATTEMPTS", "4"))
+BROADCAST_RETRY_BASE_SECONDS = float(os.getenv("BROADCAST_RETRY_BASE_SECONDS", "1"))
+
+# =============================================================================
+# EMAIL SETTINGS
+# =============================================================================
+
+# Outbound SMTP server; leave SMTP_HOST empty to only draft emails
+SMTP_HOST = os.getenv("SMTP_HOST", "")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME)
+
+# Delivery engine tuning
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "2"))          # Reused SMTP connections
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))       # Messages per connection checkout
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "2"))
+EMAIL_DOMAIN_RATE = float(os.getenv("EMAIL_DOMAIN_RATE", "5"))    # Messages/second per recipient domain
+EMAIL_CONNECTION_IDLE_SECONDS = float(os.getenv("EMAIL_CONNECTION_IDLE_SECONDS", "60"))
+
 
 # =============================================================================
 # SERVER SETTINGS
@@ -34,6 +81,15 @@ os.environ["TELEGRAM_BOT_TOKEN"] = TELEGRAM_BOT_TOKEN
 
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "https://polite-areas-tickle.loca.lt")
 
+# Token for the /admin endpoints (sent as X-Admin-Token); empty disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Sampling profiler settings for /admin/profile
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "120"))
+# Per-request memory accounting for /metrics/memory (tracemalloc adds ~10-30% overhead)
+MEMORY_TRACKING = os.getenv("MEMORY_TRACKING", "false").lower() == "true"
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+
 # =============================================================================
 # MODEL SETTINGS
 # =============================================================================
@@ -42,6 +98,123 @@ PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "https://polite-areas-tickle.loca
 DEFAULT_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
 DEFAULT_TEMPERATURE = 0
 
+# Adaptive (AIMD) limit on concurrent Groq calls per model, shared by all agents
+LLM_LIMIT_INITIAL = float(os.getenv("LLM_LIMIT_INITIAL", "4"))
+LLM_LIMIT_MIN = float(os.getenv("LLM_LIMIT_MIN", "1"))
+LLM_LIMIT_MAX = float(os.getenv("LLM_LIMIT_MAX", "32"))
+# Multiplier applied to the limit when Groq answers 429
+LLM_LIMIT_BACKOFF = float(os.getenv("LLM_LIMIT_BACKOFF", "0.5"))
+# Share of the limit kept free for interactive calls (planner, reviewer)
+LLM_INTERACTIVE_RESERVE = float(os.getenv("LLM_INTERACTIVE_RESERVE", "0.25"))
+# The limit stops growing while calls are this many times slower than usual
+LLM_LATENCY_TOLERANCE = float(os.getenv("LLM_LATENCY_TOLERANCE", "2.0"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+# Connection errors, timeouts, 408/409 and 5xx are retried this often, with exponential backoff
+LLM_TRANSIENT_RETRIES = int(os.getenv("LLM_TRANSIENT_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_ACQUIRE_TIMEOUT = float(os.getenv("LLM_ACQUIRE_TIMEOUT", "120"))
+
+# =============================================================================
+# SHARED STATE SETTINGS
+# =============================================================================
+
+# Where caches, dedupe records and rate-limit counters live:
+# "memory" (one process), "sqlite" (all workers on one host) or "redis" (cluster)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", "state.sqlite")
+STATE_MEMORY_MAX_KEYS = int(os.getenv("STATE_MEMORY_MAX_KEYS", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Twilio retries a webhook with the same MessageSid; remember ids this long
+DEDUPE_TTL_SECONDS = int(os.getenv("DEDUPE_TTL_SECONDS", "3600"))
+
+# =============================================================================
+# JOB QUEUE / WORKER SETTINGS
+# =============================================================================
+
+# When enabled the webhook only enqueues; run `python worker.py` to process jobs
+JOB_QUEUE_ENABLED = os.getenv("JOB_QUEUE_ENABLED", "false").lower() == "true"
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite")
+# A claimed job becomes visible to other workers again after this many seconds
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+# Jobs that fail this many times are moved to the dead-letter state
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "10"))
+# Jobs processed at the same time by one worker process
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "0.5"))
+
+# =============================================================================
+# SCHEDULER SETTINGS
+# =============================================================================
+
+# Reminders and scheduled emails; the dispatcher runs in processes with this enabled
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() == "true"
+SCHEDULER_DB_PATH = os.getenv("SCHEDULER_DB_PATH", "scheduler.sqlite")
+# Only jobs due within this many seconds are kept in memory
+SCHEDULER_HORIZON = float(os.getenv("SCHEDULER_HORIZON", "3600"))
+# How often jobs added by other processes are picked up from the database
+SCHEDULER_REFILL_INTERVAL = float(os.getenv("SCHEDULER_REFILL_INTERVAL", "30"))
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "500"))
+SCHEDULER_SEND_WORKERS = int(os.getenv("SCHEDULER_SEND_WORKERS", "16"))
+SCHEDULER_MAX_ATTEMPTS = int(os.getenv("SCHEDULER_MAX_ATTEMPTS", "5"))
+SCHEDULER_RETRY_DELAY = float(os.getenv("SCHEDULER_RETRY_DELAY", "60"))
+# A job stuck "firing" this long (crashed process) is fired again
+SCHEDULER_CLAIM_TIMEOUT = float(os.getenv("SCHEDULER_CLAIM_TIMEOUT", "300"))
+# Time zone (IANA name, e.g. Europe/Paris) for reminder and send times that do not name one
+USER_TIMEZONE = os.getenv("USER_TIMEZONE", "UTC")
+
+# =============================================================================
+# TOOL SETTINGS
+# =============================================================================
+
+# Threads shared by all tool runs (per-tool limits are set in tools/registry.py)
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "32"))
+# Results of cacheable tools (calculator, search) are reused for this long
+TOOL_CACHE_TTL = int(os.getenv("TOOL_CACHE_TTL", "600"))
+# Speculatively run search/calculator on the raw message while the planner thinks
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "false").lower() == "true"
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "8"))
+# Minimum word overlap (0-1) between a plan's search query and the speculated one;
+# 1.0 only reuses a speculated search for the same normalized query
+SPECULATION_MIN_SIMILARITY = float(os.getenv("SPECULATION_MIN_SIMILARITY", "1.0"))
+
+# =============================================================================
+# REVIEW LOOP SETTINGS
+# =============================================================================
+
+# Max rewrite/re-search rounds after the first draft
+REVIEW_MAX_REVISIONS = int(os.getenv("REVIEW_MAX_REVISIONS", "2"))
+# Wall-clock budget (seconds) for the whole writer ↔ reviewer loop
+REVIEW_BUDGET_SECONDS = float(os.getenv("REVIEW_BUDGET_SECONDS", "60"))
+# Drafts outside these bounds always go to the reviewer LLM
+REVIEW_MIN_CHARS = int(os.getenv("REVIEW_MIN_CHARS", "80"))
+REVIEW_MAX_CHARS = int(os.getenv("REVIEW_MAX_CHARS", "6000"))
+
+# =============================================================================
+# CHECKPOINT SETTINGS
+# =============================================================================
+
+# SQLite file holding LangGraph checkpoints (one thread per request)
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite")
+# Threads idle for longer than this are deleted
+CHECKPOINT_RETENTION_HOURS = float(os.getenv("CHECKPOINT_RETENTION_HOURS", "24"))
+# Minimum seconds between two compaction passes
+CHECKPOINT_COMPACT_INTERVAL = int(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "600"))
+# A run holds its thread for this long unless the worker heartbeat refreshes it; kept
+# below JOB_VISIBILITY_TIMEOUT so a crashed worker's lease is gone before its job is reclaimed
+RUN_LEASE_TTL = min(float(os.getenv("RUN_LEASE_TTL", "120")), JOB_VISIBILITY_TIMEOUT / 2)
+
+# =============================================================================
+# RECORD / REPLAY SETTINGS
+# =============================================================================
+
+# "off", "record" (save LLM/search calls) or "replay" (serve them from the cassette)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/session.jsonl.gz")
+# Replayed calls sleep for their recorded latency times this factor (0 = instant)
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "1.0"))
+
 # =============================================================================
 # VALIDATION
 # =============================================================================
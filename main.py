@@ -4,17 +4,43 @@ FastAPI server with WhatsApp/Twilio integration.
 Uses the original planner → executor workflow pattern.
 """
 
-from fastapi import FastAPI, Form
+import asyncio
+import hmac
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Form, BackgroundTasks, Depends, Header, HTTPException, Request
 from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
 from twilio.twiml.messaging_response import MessagingResponse
 
 # Import configuration (this loads .env automatically)
-from config import validate_config, PUBLIC_BASE_URL
+from config import (
+    validate_config,
+    PUBLIC_BASE_URL,
+    STREAMING_REPLIES,
+    DEDUPE_TTL_SECONDS,
+    JOB_QUEUE_ENABLED,
+    SCHEDULER_ENABLED,
+    ADMIN_TOKEN,
+    PROFILER_MAX_SECONDS,
+)
 
 # Import the workflow
-from workflows.research_flow import run_workflow
+from workflows.research_flow import RunInProgress, run_workflow
+from agents.writer import WriterAgent
+from workflows.speculation import speculator
+
+# Outbound delivery
+from services.whatsapp import WhatsAppSender
+from services.streaming import StreamingDelivery, split_message, recent_deliveries
+from services.state_backend import get_state_backend
+from services.job_queue import JobQueue
+from services.broadcast import Broadcaster, render
+from services.scheduler import get_scheduler
+from services.memory import memory_tracker
+from services.llm_limiter import llm_limiter
+from services import profiler
 
 
 # =============================================================================
@@ -24,6 +50,20 @@ from workflows.research_flow import run_workflow
 print("🚀 Starting ManIt...")
 validate_config()
 
+whatsapp_sender = WhatsAppSender()
+if STREAMING_REPLIES and not whatsapp_sender.enabled:
+    print("⚠️  STREAMING_REPLIES needs Twilio credentials, falling back to TwiML replies")
+
+# With the job queue enabled, worker.py processes messages instead of this process
+job_queue = JobQueue() if JOB_QUEUE_ENABLED else None
+
+# Answer to a retry that arrives while the first copy of the message is still running
+STILL_WORKING = "I'm still working on your previous message, the reply will follow shortly."
+
+# Fires reminders and scheduled emails (safe to enable in several processes)
+if SCHEDULER_ENABLED:
+    get_scheduler().start()
+
 
 # =============================================================================
 # FASTAPI APPLICATION
@@ -39,6 +79,21 @@ app = FastAPI(
 class AgentRequest(BaseModel):
     """Request body for the JSON API endpoint."""
     message: str
+    thread_id: Optional[str] = None  # Reuse to resume/dedupe a retried request
+
+
+class BroadcastRecipient(BaseModel):
+    """One broadcast contact and the values for its {placeholders}."""
+    to: str                          # e.g. whatsapp:+1234567890
+    vars: Dict[str, str] = {}
+
+
+class BroadcastRequest(BaseModel):
+    """Request body for a broadcast: a topic for the writer, or a ready body."""
+    recipients: List[BroadcastRecipient]
+    topic: str = ""
+    instructions: str = ""
+    body: Optional[str] = None       # Send this text instead of generating one
 
 
 @app.get("/")
@@ -68,15 +123,83 @@ def agent_json(req: AgentRequest):
     print(f"📨 Received JSON request: {req.message}")
     
     try:
-        response = run_workflow(req.message)
+        response = run_workflow(req.message, thread_id=req.thread_id)
         return {"reply": response}
+    except RunInProgress:
+        return {"reply": STILL_WORKING}
     except Exception as e:
         return {"reply": f"Error: {str(e)}"}
 
+@app.get("/metrics/jobs")
+def job_metrics():
+    """Job queue depth per status (when the job queue is enabled)."""
+    if not job_queue:
+        return {"enabled": False}
+    return {"enabled": True, **job_queue.stats()}
+
+
+@app.get("/metrics/scheduler")
+def scheduler_metrics():
+    """Scheduled job counts and fire rate (when the scheduler is enabled)."""
+    if not SCHEDULER_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_scheduler().stats()}
+
+
+@app.get("/metrics/streaming")
+def streaming_metrics():
+    """Chunk latency metrics of recent streamed replies."""
+    deliveries = list(recent_deliveries)
+    first = sorted(d["time_to_first_message"] for d in deliveries if d["time_to_first_message"] is not None)
+    last = sorted(d["time_to_last_message"] for d in deliveries if d["time_to_last_message"] is not None)
+    return {
+        "deliveries": len(deliveries),
+        "median_time_to_first_message": first[len(first) // 2] if first else None,
+        "median_time_to_last_message": last[len(last) // 2] if last else None,
+        "recent": deliveries[-10:],
+    }
+
+
+@app.get("/metrics/llm")
+def llm_metrics():
+    """Adaptive concurrency limit, queueing and 429 counts per Groq model."""
+    return llm_limiter.stats()
+
+
+@app.get("/metrics/memory")
+def memory_metrics(top: int = 15):
+    """Process RSS plus per-request memory accounting (when MEMORY_TRACKING=true)."""
+    return memory_tracker.snapshot(top)
+
+
+@app.get("/metrics/speculation")
+def speculation_metrics():
+    """Hit rate and wasted-call ratio of speculative tool prefetch."""
+    return speculator.stats()
+
+
+def deliver_streaming_reply(to: str, body: str, thread_id: str = None):
+    """Run the workflow and stream the reply to WhatsApp as several messages."""
+    delivery = StreamingDelivery(whatsapp_sender.send, to)
+    
+    try:
+        response = run_workflow(body, thread_id=thread_id, reply_sink=delivery.feed, recipient=to)
+    except RunInProgress:
+        response = STILL_WORKING
+    except Exception as e:
+        # Part of the reply may already be out; the error follows it
+        delivery.finish(error=f"Sorry, I encountered an error: {str(e)}")
+        return
+    
+    delivery.finish(response)
+
+
 @app.post("/twilio-whatsapp")
 async def twilio_whatsapp(
+    background_tasks: BackgroundTasks,
     From: str = Form(...),
     Body: str = Form(...),
+    MessageSid: str = Form(""),
 ):
     """
     Webhook endpoint for Twilio WhatsApp messages.
@@ -85,23 +208,210 @@ async def twilio_whatsapp(
     Twilio sends:
         - From: The sender's WhatsApp number (e.g., whatsapp:+1234567890)
         - Body: The message text
+        - MessageSid: Unique message id (same on Twilio retries, used as thread id)
     """
     print(f"📱 WhatsApp message from {From}: {Body}")
     
+    # Queue / streaming modes: acknowledge now, send the reply via the REST API
+    if job_queue or (STREAMING_REPLIES and whatsapp_sender.enabled):
+        # Twilio retries reuse the MessageSid; only the first copy runs
+        if MessageSid and not get_state_backend().add(f"dedupe:{MessageSid}", "1", ttl=DEDUPE_TTL_SECONDS):
+            print(f"♻️  Duplicate webhook {MessageSid}, ignoring")
+        elif job_queue:
+            job_id = job_queue.enqueue({"to": From, "body": Body, "thread_id": MessageSid or None})
+            print(f"📥 Queued job {job_id}")
+        else:
+            background_tasks.add_task(deliver_streaming_reply, From, Body, MessageSid or None)
+        return PlainTextResponse(str(MessagingResponse()), media_type="application/xml")
+    
     try:
         # Run the agent workflow
-        response = run_workflow(Body)
+        response = run_workflow(Body, thread_id=MessageSid or None, recipient=From)
+    except RunInProgress:
+        response = STILL_WORKING
     except Exception as e:
         response = f"Sorry, I encountered an error: {str(e)}"
     
-    # Build TwiML response
+    # Build TwiML response (long replies become several messages)
     twiml = MessagingResponse()
-    twiml.message(response)
+    for chunk in split_message(response):
+        twiml.message(chunk)
     
     # Return as XML
     return PlainTextResponse(str(twiml), media_type="application/xml")
 
 
+# =============================================================================
+# ADMIN: SAMPLING PROFILER
+# =============================================================================
+
+profile_lock = asyncio.Lock()
+
+
+def require_admin(x_admin_token: str = Header("")):
+    """Admin endpoints exist only when ADMIN_TOKEN is set, and require it."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def profile_response(sampler: profiler.SamplingProfiler, format: str, limit: int):
+    """Return a profile as JSON (top table + collapsed stacks) or plain collapsed stacks."""
+    if format == "collapsed":
+        return PlainTextResponse(sampler.collapsed())
+    return sampler.report(limit)
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile(seconds: float = 10, format: str = "json", limit: int = 30, idle: bool = False):
+    """
+    Sample every thread for `seconds` and return where the time went.
+    
+    Example:
+        curl -H "X-Admin-Token: $ADMIN_TOKEN" \
+             "http://localhost:8000/admin/profile?seconds=30&format=collapsed" > out.folded
+    """
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    async with profile_lock:
+        sampler = profiler.SamplingProfiler(include_idle=idle)
+        sampler.start()
+        try:
+            await asyncio.sleep(min(seconds, PROFILER_MAX_SECONDS))
+        finally:
+            sampler.stop()
+    
+    return profile_response(sampler, format, limit)
+
+
+@app.get("/admin/profile/requests", dependencies=[Depends(require_admin)])
+async def admin_profile_requests(
+    count: int = 1,
+    path: str = "/twilio-whatsapp",
+    timeout: float = 300,
+    format: str = "json",
+    limit: int = 30,
+):
+    """
+    Profile the next `count` requests whose path starts with `path`.
+    Returns when they have finished, or after `timeout` seconds.
+    """
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    async with profile_lock:
+        session = profiler.RequestProfileSession(count, path)
+        session.profiler.start()
+        profiler.active_request_session = session
+        try:
+            await asyncio.to_thread(session.finished.wait, timeout)
+        finally:
+            profiler.active_request_session = None
+            session.profiler.stop()
+    
+    return profile_response(session.profiler, format, limit)
+
+
+if ADMIN_TOKEN:
+    # Only installed when admin endpoints are enabled, so there is no
+    # per-request cost otherwise
+    @app.middleware("http")
+    async def profile_matching_requests(request: Request, call_next):
+        session = profiler.active_request_session
+        path = request.url.path
+        if session is None or path.startswith("/admin") or not session.matches(path):
+            return await call_next(request)
+        
+        session.request_started()
+        try:
+            return await call_next(request)
+        finally:
+            session.request_finished()
+
+
+# =============================================================================
+# ADMIN: BROADCASTS
+# =============================================================================
+
+broadcaster = None
+
+
+def get_broadcaster() -> Broadcaster:
+    """Create the broadcaster (and its status database) on first use."""
+    global broadcaster
+    if broadcaster is None:
+        broadcaster = Broadcaster()
+    if not broadcaster.enabled:
+        raise HTTPException(status_code=503, detail="Broadcasts need TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN")
+    return broadcaster
+
+
+@app.post("/admin/broadcast", dependencies=[Depends(require_admin)])
+def admin_broadcast(req: BroadcastRequest):
+    """
+    Send one announcement to many contacts.
+    
+    The writer runs once; {placeholders} such as {name} are filled in per
+    recipient from its "vars" without further LLM calls. Delivery happens
+    in the background, poll GET /admin/broadcast/{id} for progress.
+    
+    Example:
+        curl -H "X-Admin-Token: $ADMIN_TOKEN" -H "Content-Type: application/json" \
+             -d '{"topic": "We open on Sundays from May", "recipients": [{"to": "whatsapp:+1...", "vars": {"name": "Ana"}}]}' \
+             http://localhost:8000/admin/broadcast
+    """
+    if not req.recipients:
+        raise HTTPException(status_code=400, detail="No recipients")
+    if not req.body and not req.topic:
+        raise HTTPException(status_code=400, detail="Give a topic to write about or a body to send")
+    sender = get_broadcaster()
+    
+    template = req.body
+    if not template:
+        placeholders = sorted({name for r in req.recipients for name in r.vars})
+        instructions = req.instructions
+        if placeholders:
+            names = ", ".join("{" + name + "}" for name in placeholders)
+            instructions += f" Where it fits, use these placeholders exactly as written: {names}."
+        template = WriterAgent().write(
+            task="short WhatsApp announcement",
+            content=req.topic,
+            instructions=instructions.strip()
+        )
+    
+    broadcast_id = sender.start(template, [(r.to, r.vars) for r in req.recipients])
+    print(f"📣 Broadcast {broadcast_id[:8]} started for {len(req.recipients)} recipients")
+    return {
+        "id": broadcast_id,
+        "recipients": len(req.recipients),
+        "preview": render(template, req.recipients[0].vars),
+    }
+
+
+@app.get("/admin/broadcast/{broadcast_id}", dependencies=[Depends(require_admin)])
+def admin_broadcast_status(broadcast_id: str):
+    """Per-status recipient counts, messages per second and the first failures."""
+    status = get_broadcaster().store.status(broadcast_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown broadcast")
+    return status
+
+
+@app.post("/admin/broadcast/{broadcast_id}/resume", dependencies=[Depends(require_admin)])
+def admin_broadcast_resume(broadcast_id: str):
+    """
+    Deliver to the still-queued recipients of a broadcast (e.g. after a restart).
+    Does nothing ("resumed": false) while the broadcast is still being delivered.
+    """
+    sender = get_broadcaster()
+    if sender.store.template(broadcast_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown broadcast")
+    resumed = sender.resume(broadcast_id)
+    return {"id": broadcast_id, "resumed": resumed, "queued": len(sender.store.queued(broadcast_id))}
+
+
 # =============================================================================
 # STARTUP MESSAGE
 # =============================================================================
@@ -0,0 +1,159 @@
+"""
+replay_regression.py - Pipeline Performance Regression Check
+Records WhatsApp conversations into cassettes (LLM + search calls with timing),
+then replays them through run_workflow to measure CPU time, peak allocations
+and end-to-end latency against a stored baseline.
+
+Usage (from project root, with venv activated):
+    # Record a conversation (uses the live Groq/Tavily APIs)
+    python replay_regression.py record cassettes/email.jsonl.gz "Write an email to ..." "What is 25 * 4?"
+
+    # Replay every cassette in a directory and compare with the baseline
+    python replay_regression.py replay cassettes/ --baseline cassettes/baseline.json
+
+    # Accept the current numbers as the new baseline
+    python replay_regression.py replay cassettes/ --baseline cassettes/baseline.json --update
+
+Exits with status 1 if any metric is worse than baseline * (1 + tolerance).
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+
+from services.cassette import cassette, CassetteMiss
+from services.state_backend import reset_state_backend
+from workflows.research_flow import run_workflow
+
+
+METRICS = ("wall_seconds", "cpu_seconds", "peak_alloc_kb")
+
+
+def record(path: str, messages: list) -> None:
+    """Run a conversation against the live APIs and save it as a cassette."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    cassette.configure("record", path, meta={"conversation": messages, "recorded_at": time.time()})
+    for message in messages:
+        print(f"\n📨 {message}")
+        print(run_workflow(message))
+    cassette.save()
+    print(f"\n💾 Saved {len(cassette.entries)} interactions to {path}")
+
+
+def replay_once(path: str, latency_scale: float, trace_memory: bool) -> dict:
+    """Replay one cassette's conversation and measure it."""
+    cassette.configure("replay", path, latency_scale)
+    reset_state_backend()  # no tool results cached from a previous run
+    
+    if trace_memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    for message in cassette.meta.get("conversation", []):
+        run_workflow(message, thread_id=f"replay-{uuid.uuid4().hex}")
+    
+    result = {
+        "wall_seconds": time.perf_counter() - wall_start,
+        "cpu_seconds": time.process_time() - cpu_start,
+    }
+    if trace_memory:
+        result["peak_alloc_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+
+def replay(directory: str, baseline_path: str, repeat: int, latency_scale: float,
+           tolerance: float, update: bool) -> int:
+    paths = sorted(glob.glob(os.path.join(directory, "*.jsonl.gz")))
+    if not paths:
+        print(f"No cassettes found in {directory}")
+        return 1
+    
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+    
+    results = {}
+    regressions = []
+    for path in paths:
+        name = os.path.basename(path)
+        try:
+            # Timing runs without tracemalloc (it slows everything down),
+            # then one extra run for the allocation peak
+            runs = [replay_once(path, latency_scale, trace_memory=False) for _ in range(repeat)]
+            memory = replay_once(path, latency_scale, trace_memory=True)
+        except CassetteMiss as e:
+            print(f"❌ {name}: pipeline made a call that was not recorded ({e})")
+            regressions.append(name)
+            continue
+        
+        results[name] = {
+            "wall_seconds": round(statistics.median(r["wall_seconds"] for r in runs), 4),
+            "cpu_seconds": round(statistics.median(r["cpu_seconds"] for r in runs), 4),
+            "peak_alloc_kb": round(memory["peak_alloc_kb"], 1),
+        }
+        
+        line = []
+        for metric in METRICS:
+            value = results[name][metric]
+            expected = baseline.get(name, {}).get(metric)
+            if expected is None:
+                line.append(f"{metric}={value}")
+                continue
+            change = (value - expected) / expected if expected else 0.0
+            flag = ""
+            if change > tolerance:
+                flag = " ❌"
+                regressions.append(f"{name}:{metric}")
+            line.append(f"{metric}={value} ({change:+.0%}){flag}")
+        print(f"{name}: " + ", ".join(line))
+    
+    if update:
+        baseline.update(results)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline written to {baseline_path}")
+        return 0
+    
+    if regressions:
+        print(f"\n❌ Regressions: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record/replay performance regression check.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    rec = commands.add_parser("record", help="record a conversation into a cassette")
+    rec.add_argument("path", help="cassette file (.jsonl.gz)")
+    rec.add_argument("messages", nargs="+", help="user messages, in order")
+    
+    rep = commands.add_parser("replay", help="replay cassettes and compare with the baseline")
+    rep.add_argument("directory", help="directory of .jsonl.gz cassettes")
+    rep.add_argument("--baseline", default="cassettes/baseline.json")
+    rep.add_argument("--repeat", type=int, default=3, help="timing runs per cassette (median is used)")
+    rep.add_argument("--latency-scale", type=float, default=1.0,
+                     help="multiply recorded LLM/search latency (0 = CPU only)")
+    rep.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    rep.add_argument("--update", action="store_true", help="store the results as the new baseline")
+    
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.path, args.messages)
+        return
+    sys.exit(replay(args.directory, args.baseline, args.repeat, args.latency_scale,
+                    args.tolerance, args.update))
+
+
+if __name__ == "__main__":
+    main()
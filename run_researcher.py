@@ -26,8 +26,9 @@ def main() -> None:
     agent = ResearcherAgent()
     print("\n--- Running ResearcherAgent ---\n")
     try:
-        result = agent.research(topic)
-        print(result)
+        for chunk in agent.stream_research(topic):
+            print(chunk, end="", flush=True)
+        print()
     except Exception as e:
         print(f"Error while running ResearcherAgent: {e}")
 
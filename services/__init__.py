@@ -0,0 +1,9 @@
+"""
+services/__init__.py - Services Package
+Delivery and infrastructure services used by the web tier and workflows.
+"""
+
+from services.whatsapp import WhatsAppSender
+from services.streaming import MessageChunker, StreamingDelivery, split_message
+
+__all__ = ["WhatsAppSender", "MessageChunker", "StreamingDelivery", "split_message"]
@@ -0,0 +1,425 @@
+"""
+services/broadcast.py - Broadcast Delivery
+Sends one announcement to many WhatsApp contacts. The text is generated once;
+per-recipient {placeholders} are filled in locally. Delivery runs on its own
+asyncio loop over a pooled HTTP client, paced to the sender's rate limit,
+with retries and per-recipient status kept in SQLite.
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from config import (
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_WHATSAPP_FROM,
+    TWILIO_API_BASE,
+    BROADCAST_DB_PATH,
+    BROADCAST_RATE,
+    BROADCAST_CONNECTIONS,
+    BROADCAST_MAX_ATTEMPTS,
+    BROADCAST_RETRY_BASE_SECONDS,
+)
+from services.streaming import split_message
+
+
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+# Rate-limit responses in a row before a recipient is given up on
+MAX_THROTTLES = 20
+
+
+def render(template: str, variables: dict) -> str:
+    """Fill {name} placeholders; unknown placeholders are left as they are."""
+    return PLACEHOLDER.sub(lambda m: str(variables.get(m.group(1), m.group(0))), template)
+
+
+# =============================================================================
+# STATUS STORE
+# =============================================================================
+
+class BroadcastStore:
+    """
+    SQLite (WAL) record of every broadcast and the delivery status of each
+    recipient: queued → sent | failed.
+    """
+
+    def __init__(self, path: str = BROADCAST_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                id TEXT PRIMARY KEY,
+                template TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'sending',
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS broadcast_recipients (
+                broadcast_id TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                variables TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                sid TEXT,
+                error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (broadcast_id, recipient)
+            );
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, template: str, recipients: list) -> str:
+        """
+        Store a broadcast and its recipients.
+
+        Args:
+            template: Message text with optional {placeholders}
+            recipients: List of (address, variables dict); duplicates are dropped
+
+        Returns:
+            The broadcast id
+        """
+        broadcast_id = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO broadcasts (id, template, created_at) VALUES (?, ?, ?)",
+                (broadcast_id, template, time.time()),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO broadcast_recipients (broadcast_id, recipient, variables) "
+                "VALUES (?, ?, ?)",
+                [(broadcast_id, to, json.dumps(variables)) for to, variables in recipients],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return broadcast_id
+
+    def template(self, broadcast_id: str) -> str:
+        row = self._conn().execute(
+            "SELECT template FROM broadcasts WHERE id = ?", (broadcast_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def queued(self, broadcast_id: str) -> list:
+        """(address, variables) of recipients not yet sent to."""
+        rows = self._conn().execute(
+            "SELECT recipient, variables FROM broadcast_recipients "
+            "WHERE broadcast_id = ? AND status = 'queued'",
+            (broadcast_id,),
+        ).fetchall()
+        return [(to, json.loads(variables)) for to, variables in rows]
+
+    def mark_started(self, broadcast_id: str) -> None:
+        self._conn().execute(
+            "UPDATE broadcasts SET status = 'sending', started_at = COALESCE(started_at, ?), "
+            "finished_at = NULL WHERE id = ?",
+            (time.time(), broadcast_id),
+        )
+
+    def mark_finished(self, broadcast_id: str) -> None:
+        self._conn().execute(
+            "UPDATE broadcasts SET status = 'done', finished_at = ? WHERE id = ?",
+            (time.time(), broadcast_id),
+        )
+
+    def record(self, broadcast_id: str, results: list) -> None:
+        """Save a batch of (address, status, attempts, sid, error) outcomes."""
+        now = time.time()
+        self._conn().executemany(
+            "UPDATE broadcast_recipients SET status = ?, attempts = ?, sid = ?, error = ?, updated_at = ? "
+            "WHERE broadcast_id = ? AND recipient = ?",
+            [(status, attempts, sid, error, now, broadcast_id, to)
+             for to, status, attempts, sid, error in results],
+        )
+
+    def status(self, broadcast_id: str, failures: int = 20) -> dict:
+        """Counts per recipient status, delivery rate and the first failures."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT status, created_at, started_at, finished_at FROM broadcasts WHERE id = ?",
+            (broadcast_id,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        status, created_at, started_at, finished_at = row
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM broadcast_recipients WHERE broadcast_id = ? GROUP BY status",
+            (broadcast_id,),
+        ).fetchall())
+        failed = conn.execute(
+            "SELECT recipient, error FROM broadcast_recipients "
+            "WHERE broadcast_id = ? AND status = 'failed' LIMIT ?",
+            (broadcast_id, failures),
+        ).fetchall()
+
+        elapsed = (finished_at or time.time()) - started_at if started_at else 0
+        return {
+            "id": broadcast_id,
+            "status": status,
+            "queued": counts.get("queued", 0),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "elapsed_seconds": round(elapsed, 2),
+            "messages_per_second": round(counts.get("sent", 0) / elapsed, 2) if elapsed else 0.0,
+            "failures": [{"to": to, "error": error} for to, error in failed],
+        }
+
+
+# =============================================================================
+# DELIVERY
+# =============================================================================
+
+class Pacer:
+    """Spaces sends 1/rate seconds apart across all workers of one broadcast."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every send for `seconds` (provider asked us to slow down)."""
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+class Broadcaster:
+    """
+    Delivers broadcasts through the Twilio Messages API with an
+    httpx.AsyncClient whose keep-alive pool is shared by all workers.
+
+    - 2xx: the part is sent (long texts go out as several messages, in order)
+    - 429: every worker pauses for Retry-After, then the part is retried
+    - 5xx / network errors: retried with exponential backoff
+    - other 4xx (bad number, opted out, ...): the recipient fails at once
+    """
+
+    def __init__(self, store: BroadcastStore = None, account_sid: str = TWILIO_ACCOUNT_SID,
+                 auth_token: str = TWILIO_AUTH_TOKEN, sender: str = TWILIO_WHATSAPP_FROM,
+                 api_base: str = TWILIO_API_BASE, rate: float = BROADCAST_RATE,
+                 connections: int = BROADCAST_CONNECTIONS, max_attempts: int = BROADCAST_MAX_ATTEMPTS,
+                 retry_base: float = BROADCAST_RETRY_BASE_SECONDS):
+        self.store = store or BroadcastStore()
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.sender = sender
+        self.api_base = api_base
+        self.rate = rate
+        self.connections = connections
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.requests = 0
+        self.throttled = 0
+        self._running = set()   # ids of broadcasts being delivered by this process
+        self._running_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """True when Twilio credentials are configured."""
+        return bool(self.account_sid and self.auth_token)
+
+    def start(self, template: str, recipients: list) -> str:
+        """Store a broadcast and deliver it in a background thread; returns its id."""
+        broadcast_id = self.store.create(template, recipients)
+        self.resume(broadcast_id)
+        return broadcast_id
+
+    def resume(self, broadcast_id: str) -> bool:
+        """
+        (Re)deliver to every recipient of a broadcast that is still queued.
+        Returns False, and does nothing, while the broadcast is already being delivered.
+        """
+        if not self._claim(broadcast_id):
+            return False
+        threading.Thread(
+            target=self._run, args=(broadcast_id,),
+            name=f"broadcast-{broadcast_id[:8]}", daemon=True
+        ).start()
+        return True
+
+    async def deliver(self, broadcast_id: str) -> dict:
+        """Send a stored broadcast to its queued recipients and return its status."""
+        if not self._claim(broadcast_id):
+            return self.store.status(broadcast_id)
+        try:
+            return await self._deliver(broadcast_id)
+        finally:
+            self._release(broadcast_id)
+
+    def _claim(self, broadcast_id: str) -> bool:
+        with self._running_lock:
+            if broadcast_id in self._running:
+                return False
+            self._running.add(broadcast_id)
+            return True
+
+    def _release(self, broadcast_id: str) -> None:
+        with self._running_lock:
+            self._running.discard(broadcast_id)
+
+    def _run(self, broadcast_id: str) -> None:
+        try:
+            asyncio.run(self._deliver(broadcast_id))
+        finally:
+            self._release(broadcast_id)
+
+    async def _deliver(self, broadcast_id: str) -> dict:
+        template = self.store.template(broadcast_id)
+        self.store.mark_started(broadcast_id)
+
+        jobs = asyncio.Queue()
+        for to, variables in self.store.queued(broadcast_id):
+            parts = split_message(render(template, variables))
+            jobs.put_nowait({"to": to, "parts": parts, "next": 0, "attempts": 0, "throttles": 0, "sid": None})
+
+        results = []
+        pacer = Pacer(self.rate)
+        limits = httpx.Limits(max_connections=self.connections, max_keepalive_connections=self.connections)
+        async with httpx.AsyncClient(base_url=self.api_base, auth=(self.account_sid, self.auth_token),
+                                     limits=limits, timeout=30) as client:
+            workers = [
+                asyncio.create_task(self._worker(client, jobs, pacer, results))
+                for _ in range(self.connections)
+            ]
+            flusher = asyncio.create_task(self._flush_every(broadcast_id, results, 0.5))
+            await jobs.join()
+            for task in workers + [flusher]:
+                task.cancel()
+
+        await asyncio.to_thread(self._flush, broadcast_id, results)
+        self.store.mark_finished(broadcast_id)
+        status = self.store.status(broadcast_id)
+        print(f"📣 Broadcast {broadcast_id[:8]} done: {status['sent']} sent, {status['failed']} failed "
+              f"({status['messages_per_second']} msg/s)")
+        return status
+
+    async def _worker(self, client: httpx.AsyncClient, jobs: asyncio.Queue, pacer: Pacer,
+                      results: list) -> None:
+        url = f"/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+        while True:
+            job = await jobs.get()
+            try:
+                retry_in = await self._send(client, url, job, pacer, results)
+            except Exception as e:
+                # A bug or an unexpected response must not stop the worker (jobs.join() waits on it)
+                self._done(job, "failed", f"{type(e).__name__}: {e}", results)
+                retry_in = None
+
+            if retry_in is None:
+                jobs.task_done()
+            else:
+                asyncio.create_task(self._retry_later(jobs, job, retry_in))
+
+    async def _send(self, client: httpx.AsyncClient, url: str, job: dict, pacer: Pacer, results: list):
+        """Send the remaining parts of one job; returns a retry delay or None once it is settled."""
+        job["attempts"] += 1
+        while job["next"] < len(job["parts"]):
+            await pacer.wait()
+            self.requests += 1
+            try:
+                response = await client.post(url, data={
+                    "From": self.sender, "To": job["to"], "Body": job["parts"][job["next"]],
+                })
+            except httpx.HTTPError as e:
+                return self._backoff(job, f"{type(e).__name__}: {e}", results)
+
+            if response.status_code < 300:
+                try:
+                    job["sid"] = response.json().get("sid")
+                except ValueError:
+                    job["sid"] = None
+                job["next"] += 1
+                job["throttles"] = 0
+            elif response.status_code == 429:
+                self.throttled += 1
+                job["throttles"] += 1
+                pacer.pause(self._retry_after(response.headers.get("Retry-After")))
+                if job["throttles"] >= MAX_THROTTLES:
+                    self._done(job, "failed", "Rate limited too many times", results)
+                    return None
+            elif response.status_code >= 500:
+                return self._backoff(job, f"HTTP {response.status_code}", results)
+            else:
+                self._done(job, "failed", self._error_text(response), results)
+                return None
+
+        self._done(job, "sent", None, results)
+        return None
+
+    def _retry_after(self, value: str) -> float:
+        """Seconds from a Retry-After header (delay in seconds or an HTTP date)."""
+        if not value:
+            return self.retry_base
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return self.retry_base
+
+    def _backoff(self, job: dict, error: str, results: list):
+        """Returns the retry delay, or None once the recipient is out of attempts."""
+        if job["attempts"] >= self.max_attempts:
+            self._done(job, "failed", error, results)
+            return None
+        return self.retry_base * 2 ** (job["attempts"] - 1)
+
+    @staticmethod
+    async def _retry_later(jobs: asyncio.Queue, job: dict, delay: float) -> None:
+        await asyncio.sleep(delay)
+        jobs.put_nowait(job)
+        jobs.task_done()  # The original get() stays open until the job is back in the queue
+
+    @staticmethod
+    def _done(job: dict, status: str, error: str, results: list) -> None:
+        results.append((job["to"], status, job["attempts"], job["sid"], error))
+
+    @staticmethod
+    def _error_text(response: httpx.Response) -> str:
+        try:
+            return f"HTTP {response.status_code}: {response.json().get('message', '')}"
+        except ValueError:
+            return f"HTTP {response.status_code}"
+
+    async def _flush_every(self, broadcast_id: str, results: list, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self._flush, broadcast_id, results)
+
+    def _flush(self, broadcast_id: str, results: list) -> None:
+        batch = results[:]
+        del results[:len(batch)]
+        if batch:
+            self.store.record(broadcast_id, batch)
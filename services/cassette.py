@@ -0,0 +1,158 @@
+"""
+services/cassette.py - Record/Replay Cassettes
+Captures every external interaction (Groq LLM calls, Tavily searches) with its
+timing into a gzip'd JSON-lines cassette, and serves them back in replay mode
+with the original (or scaled) latency. Local work (prompt rendering, parsing,
+docx building, our own code) still runs for real, so replays measure it.
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+from config import CASSETTE_MODE, CASSETTE_PATH, CASSETTE_LATENCY_SCALE
+
+
+class CassetteMiss(KeyError):
+    """Replay asked for an interaction that is not on the cassette."""
+
+
+def _key(kind: str, name: str, inputs: dict) -> str:
+    raw = json.dumps({"kind": kind, "name": name, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    mode "off":    calls pass straight through
+    mode "record": calls run and are appended to the cassette
+    mode "replay": calls are answered from the cassette (same inputs, in order)
+    """
+
+    def __init__(self, mode: str = CASSETTE_MODE, path: str = CASSETTE_PATH,
+                 latency_scale: float = CASSETTE_LATENCY_SCALE):
+        self._lock = threading.Lock()
+        self.configure(mode, path, latency_scale)
+
+    def configure(self, mode: str, path: str = "", latency_scale: float = 1.0, meta: dict = None) -> None:
+        """Switch mode; replay mode loads the cassette at `path`."""
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode} (use off, record or replay)")
+        with self._lock:
+            self.mode = mode
+            self.path = path
+            self.latency_scale = latency_scale
+            self.meta = dict(meta or {})
+            self.entries = []
+            self._replay = defaultdict(deque)
+        if mode == "replay":
+            self.load(path)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # -------------------------------------------------------------------------
+    # Interactions
+    # -------------------------------------------------------------------------
+
+    def call(self, kind: str, name: str, inputs: dict, fn):
+        """
+        Run (or replay) one interaction whose result is JSON-serializable.
+
+        Args:
+            kind: "llm" or "tool"
+            name: Which agent/tool made the call
+            inputs: Everything that determines the result
+            fn: Zero-argument callable doing the real call
+        """
+        if self.mode == "off":
+            return fn()
+
+        key = _key(kind, name, inputs)
+        if self.mode == "replay":
+            entry = self._next(key, kind, name)
+            time.sleep(entry["elapsed"] * self.latency_scale)
+            return entry["response"]
+
+        started = time.perf_counter()
+        response = fn()
+        self._append({
+            "kind": kind, "name": name, "key": key, "inputs": inputs,
+            "response": response, "elapsed": round(time.perf_counter() - started, 4),
+        })
+        return response
+
+    def stream(self, kind: str, name: str, inputs: dict, fn):
+        """
+        Like call(), for streamed text: yields the chunks with their original
+        spacing in time.
+        """
+        if self.mode == "off":
+            yield from fn()
+            return
+
+        key = _key(kind, name, inputs)
+        if self.mode == "replay":
+            entry = self._next(key, kind, name)
+            last = 0.0
+            for offset, text in entry["chunks"]:
+                time.sleep((offset - last) * self.latency_scale)
+                last = offset
+                yield text
+            return
+
+        started = time.perf_counter()
+        chunks = []
+        for text in fn():
+            chunks.append((round(time.perf_counter() - started, 4), text))
+            yield text
+        self._append({
+            "kind": kind, "name": name, "key": key, "inputs": inputs,
+            "chunks": chunks, "elapsed": round(time.perf_counter() - started, 4),
+        })
+
+    def _next(self, key: str, kind: str, name: str) -> dict:
+        with self._lock:
+            queue = self._replay.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded {kind} call '{name}' with these inputs in {self.path}")
+            return queue.popleft()
+
+    def _append(self, entry: dict) -> None:
+        with self._lock:
+            self.entries.append(entry)
+
+    # -------------------------------------------------------------------------
+    # Files
+    # -------------------------------------------------------------------------
+
+    def save(self, path: str = None) -> None:
+        """Write the meta line and all recorded entries as gzip'd JSON lines."""
+        path = path or self.path
+        with self._lock, gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"meta": self.meta}) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+    def load(self, path: str) -> None:
+        """Read a cassette and queue its entries for replay."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        with self._lock:
+            self.meta = lines[0].get("meta", {}) if lines and "meta" in lines[0] else {}
+            self.entries = [line for line in lines if "meta" not in line]
+            self._replay = defaultdict(deque)
+            for entry in self.entries:
+                self._replay[entry["key"]].append(entry)
+
+
+# Process-wide cassette used by agents/*.py and tools/*.py
+cassette = Cassette()
+
+if cassette.mode == "record":
+    atexit.register(cassette.save)
@@ -0,0 +1,400 @@
+"""
+services/email_engine.py - Outbound Email Engine
+Async delivery queue for emails: callers only enqueue, a background event loop
+sends batches over pooled SMTP connections with retries and per-domain rate limits.
+"""
+
+import asyncio
+import queue
+import smtplib
+import ssl
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.message import EmailMessage
+
+from config import (
+    SMTP_HOST,
+    SMTP_PORT,
+    SMTP_USERNAME,
+    SMTP_PASSWORD,
+    SMTP_STARTTLS,
+    SMTP_FROM,
+    EMAIL_POOL_SIZE,
+    EMAIL_BATCH_SIZE,
+    EMAIL_MAX_RETRIES,
+    EMAIL_RETRY_BASE_SECONDS,
+    EMAIL_DOMAIN_RATE,
+    EMAIL_CONNECTION_IDLE_SECONDS,
+)
+from services.state_backend import get_state_backend
+
+
+# Errors that mean the connection itself is unusable (not just one recipient).
+# SMTPException is an OSError subclass, so plain OSError is handled after it.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)
+
+
+def is_permanent(error: smtplib.SMTPException) -> bool:
+    """True for 5xx replies (unknown mailbox, rejected sender, ...), which retrying cannot fix."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return bool(error.recipients) and all(code >= 500 for code, _ in error.recipients.values())
+    code = getattr(error, "smtp_code", None)
+    return isinstance(code, int) and code >= 500
+
+
+# =============================================================================
+# SMTP CONNECTION POOL
+# =============================================================================
+
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` authenticated SMTP connections open and hands them out
+    for reuse, so TLS handshakes and logins are not paid per message.
+    """
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, size: int = EMAIL_POOL_SIZE,
+                 username: str = SMTP_USERNAME, password: str = SMTP_PASSWORD,
+                 starttls: bool = SMTP_STARTTLS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connections_opened = 0
+
+    def acquire(self) -> smtplib.SMTP:
+        """Return an open connection, reusing an idle one when possible."""
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < EMAIL_CONNECTION_IDLE_SECONDS:
+                    return conn
+                self._close(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn: smtplib.SMTP, broken: bool = False) -> None:
+        """Give a connection back to the pool (closing it if it is broken)."""
+        if broken:
+            self._close(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    def close_all(self) -> None:
+        """Close every idle connection."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            conn.starttls(context=ssl.create_default_context())
+        if self.username:
+            conn.login(self.username, self.password)
+        self.connections_opened += 1
+        return conn
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP) -> None:
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+
+# =============================================================================
+# EMAIL ENGINE
+# =============================================================================
+
+class EmailEngine:
+    """
+    Outbound email queue running on its own asyncio loop (in a daemon thread).
+
+    enqueue() returns immediately with a message id; worker coroutines pull
+    batches off the queue and send each batch over one pooled connection.
+    Failed messages are retried with exponential backoff, and each recipient
+    domain is limited to EMAIL_DOMAIN_RATE messages per second (counted in the
+    shared state backend, so the limit holds across workers).
+    """
+
+    def __init__(self, pool: SMTPConnectionPool = None, workers: int = EMAIL_POOL_SIZE,
+                 batch_size: int = EMAIL_BATCH_SIZE, sender: str = SMTP_FROM):
+        self.pool = pool or SMTPConnectionPool()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.sender = sender
+
+        self._loop = None
+        self._queue = None
+        self._start_lock = threading.Lock()
+        self._status = OrderedDict()
+        self._status_lock = threading.Lock()  # enqueue() callers and the loop thread both write
+        self._outstanding = 0  # Queued or in flight (only touched on the loop thread)
+
+        self.started_at = None
+        self.sent = 0
+        self.failed = 0
+
+    # -------------------------------------------------------------------------
+    # Public API (thread-safe)
+    # -------------------------------------------------------------------------
+
+    def enqueue(self, to: str, subject: str, body: str) -> str:
+        """
+        Queue an email for delivery and return its id without waiting.
+
+        Args:
+            to: Recipient email address
+            subject: Subject line
+            body: Plain-text body
+
+        Returns:
+            The message id (see status())
+        """
+        self._ensure_started()
+
+        message = {
+            "id": uuid.uuid4().hex,
+            "to": to,
+            "subject": subject,
+            "body": body,
+            "attempts": 0,
+            "queued_at": time.time(),
+        }
+        self._set_status(message["id"], "queued")
+        self._loop.call_soon_threadsafe(self._accept, message)
+        return message["id"]
+
+    def send_now(self, to: str, subject: str, body: str) -> None:
+        """
+        Send one email over a pooled connection and wait for the server's answer.
+        For callers that keep their own durable retries (the scheduler);
+        waits out the recipient domain's rate limit first.
+
+        Raises:
+            smtplib.SMTPException or OSError if the email was not accepted
+        """
+        while True:
+            wait = self._reserve_domain_slot(to)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+
+        message = {"id": uuid.uuid4().hex, "to": to, "subject": subject, "body": body}
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            conn.send_message(self._build(message))
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        except smtplib.SMTPException:  # an OSError subclass, but the connection is still usable
+            raise
+        except OSError:
+            broken = True
+            raise
+        finally:
+            self.pool.release(conn, broken=broken)
+
+    def status(self, message_id: str) -> dict:
+        """Delivery status of a queued message ({"status", "error"})."""
+        with self._status_lock:
+            return self._status.get(message_id, {"status": "unknown", "error": ""})
+
+    def stats(self) -> dict:
+        """Totals and throughput since the engine started."""
+        elapsed = time.time() - self.started_at if self.started_at else 0
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "pending": self._outstanding,
+            "connections_opened": self.pool.connections_opened,
+            "messages_per_second": round(self.sent / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Block until nothing is queued or in flight (useful for scripts/benchmarks)."""
+        deadline = time.monotonic() + timeout
+        while self._loop is not None and time.monotonic() < deadline:
+            pending = asyncio.run_coroutine_threadsafe(self._pending(), self._loop).result()
+            if pending == 0:
+                return True
+            time.sleep(0.05)
+        return self._loop is None
+
+    # -------------------------------------------------------------------------
+    # Event loop and workers
+    # -------------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        if self._loop is not None:
+            return
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._queue = asyncio.Queue()
+                for _ in range(self.workers):
+                    loop.create_task(self._worker())
+                ready.set()
+                loop.run_forever()
+
+            threading.Thread(target=run, name="email-engine", daemon=True).start()
+            ready.wait()
+            self.started_at = time.time()
+            self._loop = loop
+
+    async def _pending(self) -> int:
+        return self._outstanding
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            # Nothing below may stop the worker: every message is settled or
+            # requeued, or _outstanding (and drain()) would never settle
+            ready = []
+            for message in batch:
+                try:
+                    wait = self._reserve_domain_slot(message["to"])
+                except Exception as e:  # e.g. the shared state backend is down
+                    self._retry_or_fail(message, f"Rate limit check failed: {type(e).__name__}: {e}")
+                    continue
+                if wait > 0:
+                    self._requeue(message, wait)
+                else:
+                    ready.append(message)
+
+            if ready:
+                try:
+                    results = await asyncio.to_thread(self._send_batch, ready)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    results = {message["id"]: (error, False) for message in ready}
+                for message in ready:
+                    error, permanent = results.get(message["id"], (None, False))
+                    if error is None:
+                        self.sent += 1
+                        self._outstanding -= 1
+                        self._set_status(message["id"], "sent")
+                    else:
+                        self._retry_or_fail(message, error, permanent)
+
+    def _accept(self, message: dict) -> None:
+        self._outstanding += 1
+        self._queue.put_nowait(message)
+
+    def _requeue(self, message: dict, delay: float) -> None:
+        """Put a message back on the queue after `delay` seconds."""
+        self._loop.call_later(delay, self._queue.put_nowait, message)
+
+    def _retry_or_fail(self, message: dict, error: str, permanent: bool = False) -> None:
+        message["attempts"] += 1
+        if permanent or message["attempts"] > EMAIL_MAX_RETRIES:
+            self.failed += 1
+            self._outstanding -= 1
+            self._set_status(message["id"], "failed", error)
+            print(f"⚠️  Email {message['id']} to {message['to']} failed: {error}")
+            return
+        delay = EMAIL_RETRY_BASE_SECONDS * (2 ** (message["attempts"] - 1))
+        self._set_status(message["id"], "retrying", error)
+        self._requeue(message, delay)
+
+    def _reserve_domain_slot(self, address: str) -> float:
+        """
+        Fixed one-second window counter per recipient domain.
+
+        Returns:
+            0 if the message may be sent now, else seconds to wait
+        """
+        domain = address.rpartition("@")[2].lower()
+        now = time.time()
+        window = int(now)
+        count = get_state_backend().incr(f"email:rate:{domain}:{window}", ttl=2)
+        if count <= EMAIL_DOMAIN_RATE:
+            return 0.0
+        return window + 1 - now
+
+    def _send_batch(self, batch: list) -> dict:
+        """
+        Send a batch over one pooled connection (runs in a worker thread).
+
+        Returns:
+            Dict of message id -> (error string or None when sent, permanent)
+        """
+        results = {}
+        try:
+            conn = self.pool.acquire()
+        except Exception as e:
+            return {message["id"]: (f"SMTP connect failed: {e}", False) for message in batch}
+
+        broken = False
+        try:
+            for message in batch:
+                if broken:
+                    results[message["id"]] = ("SMTP connection lost", False)
+                    continue
+                try:
+                    email = self._build(message)
+                except Exception as e:  # e.g. a header with a line break
+                    results[message["id"]] = (f"Invalid email: {e}", True)
+                    continue
+                try:
+                    conn.send_message(email)
+                    results[message["id"]] = (None, False)
+                except CONNECTION_ERRORS as e:
+                    broken = True
+                    results[message["id"]] = (f"SMTP connection lost: {e}", False)
+                except smtplib.SMTPException as e:
+                    results[message["id"]] = (str(e), is_permanent(e))
+                except OSError as e:
+                    broken = True
+                    results[message["id"]] = (f"SMTP connection lost: {e}", False)
+        except Exception:
+            broken = True  # state of the connection is unknown
+            raise
+        finally:
+            self.pool.release(conn, broken=broken)
+        return results
+
+    def _build(self, message: dict) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = message["to"]
+        email["Subject"] = message["subject"]
+        email.set_content(message["body"])
+        return email
+
+    def _set_status(self, message_id: str, status: str, error: str = "") -> None:
+        with self._status_lock:
+            self._status[message_id] = {"status": status, "error": error}
+            self._status.move_to_end(message_id)
+            while len(self._status) > 10000:
+                self._status.popitem(last=False)
+
+
+# Shared engine; its loop and connections start on the first enqueue()
+email_engine = EmailEngine()
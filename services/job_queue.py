@@ -0,0 +1,177 @@
+"""
+services/job_queue.py - Durable Job Queue
+SQLite (WAL) backed queue shared by the web tier and worker processes.
+Claimed jobs are hidden for a visibility timeout; jobs that are not acked in
+time become claimable again, and jobs that keep failing are dead-lettered.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from config import JOB_QUEUE_PATH, JOB_VISIBILITY_TIMEOUT, JOB_MAX_ATTEMPTS
+
+
+class JobQueue:
+    """
+    Job states: ready → running → (deleted on ack) | ready (retry) | dead.
+
+    A job is identified by its id plus the attempt number it was claimed
+    with, so a worker whose claim expired cannot ack or fail a job that
+    another worker has since claimed.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH,
+                 visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._conn().executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'ready',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, available_at);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, payload: dict, delay: float = 0) -> int:
+        """
+        Add a job.
+
+        Args:
+            payload: JSON-serializable job data
+            delay: Seconds before the job may be claimed
+
+        Returns:
+            The job id
+        """
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO jobs (payload, available_at, created_at) VALUES (?, ?, ?)",
+            (json.dumps(payload), now + delay, now),
+        )
+        return cur.lastrowid
+
+    def claim(self) -> dict:
+        """
+        Claim the next due job, or return None if there is none.
+
+        Returns:
+            Dict with "id", "attempt" and "payload"
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Claims that timed out too often are dead-lettered, not retried
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'dead', last_error = 'visibility timeout exceeded'
+                WHERE status = 'running' AND available_at <= ? AND attempts >= ?
+                """,
+                (now, self.max_attempts),
+            )
+            row = conn.execute(
+                """
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, available_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status IN ('ready', 'running') AND available_at <= ?
+                    ORDER BY available_at, id LIMIT 1
+                )
+                RETURNING id, attempts, payload
+                """,
+                (now + self.visibility_timeout, now),
+            ).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        return {"id": row[0], "attempt": row[1], "payload": json.loads(row[2])}
+
+    def extend(self, job: dict, seconds: float = None) -> bool:
+        """Push back a running job's visibility timeout. Returns False if the claim was lost."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET available_at = ? WHERE id = ? AND attempts = ? AND status = 'running'",
+            (time.time() + (seconds or self.visibility_timeout), job["id"], job["attempt"]),
+        )
+        return cur.rowcount == 1
+
+    def ack(self, job: dict) -> bool:
+        """Mark a job as done (it is deleted). Returns False if the claim was lost."""
+        cur = self._conn().execute(
+            "DELETE FROM jobs WHERE id = ? AND attempts = ? AND status = 'running'",
+            (job["id"], job["attempt"]),
+        )
+        return cur.rowcount == 1
+
+    def fail(self, job: dict, error: str, retry_delay: float = 0) -> str:
+        """
+        Record a failed attempt.
+
+        Returns:
+            "retry" if the job will run again, "dead" if it was dead-lettered,
+            or "lost" if the claim had already expired
+        """
+        dead = job["attempt"] >= self.max_attempts
+        cur = self._conn().execute(
+            """
+            UPDATE jobs SET status = ?, available_at = ?, last_error = ?
+            WHERE id = ? AND attempts = ? AND status = 'running'
+            """,
+            ("dead" if dead else "ready", time.time() + retry_delay, error[:2000],
+             job["id"], job["attempt"]),
+        )
+        if cur.rowcount != 1:
+            return "lost"
+        return "dead" if dead else "retry"
+
+    def dead_letters(self, limit: int = 50) -> list:
+        """Most recent dead-lettered jobs."""
+        rows = self._conn().execute(
+            "SELECT id, attempts, payload, last_error FROM jobs WHERE status = 'dead' "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [
+            {"id": row[0], "attempts": row[1], "payload": json.loads(row[2]), "error": row[3]}
+            for row in rows
+        ]
+
+    def requeue_dead(self, job_id: int) -> bool:
+        """Give a dead-lettered job a fresh set of attempts."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = 'ready', attempts = 0, available_at = ? "
+            "WHERE id = ? AND status = 'dead'",
+            (time.time(), job_id),
+        )
+        return cur.rowcount == 1
+
+    def stats(self) -> dict:
+        """Number of jobs per status."""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {"ready": 0, "running": 0, "dead": 0}
+        counts.update(dict(rows))
+        return counts
@@ -0,0 +1,29 @@
+"""
+services/llm_clients.py - Shared LLM Clients
+One ChatGroq per (model, temperature) for the whole process. Each ChatGroq
+opens its own sync and async HTTP clients, each with a TLS context (about a
+megabyte of native memory that tracemalloc does not see), so agents share
+them instead of building new ones for every request.
+"""
+
+import threading
+
+from langchain_groq import ChatGroq
+
+from config import DEFAULT_MODEL
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_chat_model(temperature: float, model: str = DEFAULT_MODEL) -> ChatGroq:
+    """Return the process-wide ChatGroq for this model and temperature."""
+    key = (model, temperature)
+    with _models_lock:
+        if key not in _models:
+            _models[key] = ChatGroq(
+                model_name=model,
+                temperature=temperature,
+                max_retries=0,  # llm_limiter retries 429s (adapting its limit) and transient errors
+            )
+        return _models[key]
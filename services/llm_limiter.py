@@ -0,0 +1,326 @@
+"""
+services/llm_limiter.py - Adaptive LLM Concurrency Limiter
+Process-wide AIMD limit on concurrent Groq calls, one pool per model.
+The limit grows by about one permit per round of healthy calls and is cut
+multiplicatively when Groq answers 429, and every call waits out the
+Retry-After period. Connection errors, 408/409 and 5xx are retried a few
+times with exponential backoff. Two priority lanes keep short interactive calls (planner,
+reviewer) from queueing behind long writer generations.
+"""
+
+import contextvars
+import threading
+import time
+
+from config import (
+    LLM_LIMIT_INITIAL,
+    LLM_LIMIT_MIN,
+    LLM_LIMIT_MAX,
+    LLM_LIMIT_BACKOFF,
+    LLM_INTERACTIVE_RESERVE,
+    LLM_LATENCY_TOLERANCE,
+    LLM_MAX_RETRIES,
+    LLM_TRANSIENT_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_ACQUIRE_TIMEOUT,
+)
+
+# Check if the Groq SDK is available (its connection errors and timeouts are transient)
+try:
+    from groq import APIConnectionError
+except ImportError:
+    APIConnectionError = ConnectionError
+
+LANES = ("interactive", "bulk")
+
+# time.monotonic() by which the current tool step must be done (see set_deadline)
+_deadline = contextvars.ContextVar("llm_deadline", default=None)
+
+
+class LLMBusyError(RuntimeError):
+    """No permit became free within LLM_ACQUIRE_TIMEOUT or before the step deadline."""
+
+
+def set_deadline(deadline: float) -> None:
+    """
+    Make LLM calls in the current context give up at `deadline` (time.monotonic()):
+    no call starts after it, and a running stream is cut off at the next chunk.
+    """
+    _deadline.set(deadline)
+
+
+def _remaining():
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _status(error: Exception):
+    """HTTP status code carried by an SDK error, if any."""
+    response = getattr(error, "response", None)
+    return getattr(error, "status_code", None) or getattr(response, "status_code", None)
+
+
+def transient_error(error: Exception) -> bool:
+    """Whether `error` is worth retrying: a connection error, timeout, 408, 409 or 5xx."""
+    if isinstance(error, (APIConnectionError, ConnectionError)):
+        return True
+    status = _status(error)
+    return status in (408, 409) or (isinstance(status, int) and status >= 500)
+
+
+def throttle_delay(error: Exception):
+    """Seconds to wait if `error` is a 429 (from Retry-After, default 1), else None."""
+    if _status(error) != 429:
+        return None
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(headers.get("retry-after-ms")) / 1000
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class AdaptiveLimit:
+    """
+    AIMD permit pool for one model.
+
+    - ok: limit += 1/limit (held while calls are much slower than usual)
+    - throttled: limit *= backoff, at most once per Retry-After window,
+      and no call starts until the window is over
+    - bulk calls leave `reserve` of the permits free for interactive calls
+      and yield to interactive calls that are waiting
+    """
+
+    def __init__(self, name: str, initial: float = LLM_LIMIT_INITIAL, minimum: float = LLM_LIMIT_MIN,
+                 maximum: float = LLM_LIMIT_MAX, backoff: float = LLM_LIMIT_BACKOFF,
+                 reserve: float = LLM_INTERACTIVE_RESERVE, tolerance: float = LLM_LATENCY_TOLERANCE):
+        self.name = name
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.reserve = reserve
+        self.tolerance = tolerance
+
+        self.in_flight = 0
+        self.waiting = {lane: 0 for lane in LANES}
+        self.blocked_until = 0.0
+        self._next_cut = 0.0
+        self._baseline = {}  # lane -> smoothed latency of successful calls
+        self._cond = threading.Condition()
+
+        self.ok = 0
+        self.slow = 0
+        self.throttled = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def _permits(self, lane: str) -> int:
+        permits = max(1, int(self.limit))
+        if lane == "interactive" or permits < 2:
+            return permits
+        return permits - max(1, int(permits * self.reserve))
+
+    def _can_start(self, lane: str, now: float) -> bool:
+        if now < self.blocked_until:
+            return False
+        if lane != "interactive" and self.waiting["interactive"]:
+            return False
+        return self.in_flight < self._permits(lane)
+
+    def acquire(self, lane: str, timeout: float = LLM_ACQUIRE_TIMEOUT) -> bool:
+        """Wait for a permit; returns False if none came free within `timeout`."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self.waiting[lane] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._can_start(lane, now):
+                        break
+                    if now >= deadline:
+                        self.timeouts += 1
+                        return False
+                    wait = deadline - now
+                    if now < self.blocked_until:
+                        wait = min(wait, self.blocked_until - now)
+                    self._cond.wait(wait)
+            finally:
+                self.waiting[lane] -= 1
+                if lane == "interactive":
+                    self._cond.notify_all()
+            self.in_flight += 1
+            return True
+
+    def release(self, lane: str, latency: float, outcome: str, retry_after: float = None) -> None:
+        """
+        Return a permit and adjust the limit.
+
+        Args:
+            lane: Lane the permit was taken in
+            latency: Call duration (time to first chunk for streams)
+            outcome: "ok", "throttled" or "error"
+            retry_after: Seconds Groq asked us to wait (throttled only)
+        """
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == "ok":
+                self.ok += 1
+                usual = self._baseline.get(lane)
+                if usual is not None and latency > usual * self.tolerance:
+                    self.slow += 1
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self._baseline[lane] = latency if usual is None else usual * 0.9 + latency * 0.1
+            elif outcome == "throttled":
+                self.throttled += 1
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                if now >= self._next_cut:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._next_cut = now + max(retry_after, 1.0)
+            else:
+                self.errors += 1
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": dict(self.waiting),
+                "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+                "ok": self.ok,
+                "slow": self.slow,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "usual_latency": {lane: round(value, 3) for lane, value in self._baseline.items()},
+            }
+
+
+class LLMLimiter:
+    """Runs LLM calls under the adaptive limit of their model, retrying 429s and transient errors."""
+
+    def __init__(self, max_retries: int = LLM_MAX_RETRIES, acquire_timeout: float = LLM_ACQUIRE_TIMEOUT,
+                 transient_retries: int = LLM_TRANSIENT_RETRIES, retry_base: float = LLM_RETRY_BASE_SECONDS):
+        self.max_retries = max_retries
+        self.acquire_timeout = acquire_timeout
+        self.transient_retries = transient_retries
+        self.retry_base = retry_base
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, model: str) -> AdaptiveLimit:
+        with self._lock:
+            if model not in self._pools:
+                self._pools[model] = AdaptiveLimit(model)
+            return self._pools[model]
+
+    def _acquire(self, pool: AdaptiveLimit, lane: str) -> None:
+        timeout, remaining = self.acquire_timeout, _remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise LLMBusyError(f"The step ran out of time before calling the language model ({pool.name}).")
+            timeout = min(timeout, remaining)
+        if not pool.acquire(lane, timeout):
+            raise LLMBusyError(f"The language model is busy right now ({pool.name}), please try again.")
+
+    def _backoff(self, attempt: int) -> bool:
+        """Sleep before retrying a transient error; False if the step deadline comes first."""
+        delay = self.retry_base * 2 ** attempt
+        remaining = _remaining()
+        if remaining is not None and remaining <= delay:
+            return False
+        time.sleep(delay)
+        return True
+
+    def call(self, model: str, lane: str, fn):
+        """
+        Run `fn()` (one blocking LLM call) under the model's limit.
+
+        Args:
+            model: Model name (each model has its own pool)
+            lane: "interactive" (short, user-facing) or "bulk" (long generations)
+            fn: Zero-argument callable making the call
+        """
+        pool = self.pool(model)
+        throttled = transient = 0
+        while True:
+            self._acquire(pool, lane)
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                retry_after = throttle_delay(e)
+                if retry_after is not None:
+                    pool.release(lane, time.monotonic() - started, "throttled", retry_after)
+                    throttled += 1
+                    if throttled > self.max_retries:
+                        raise
+                    continue
+                pool.release(lane, time.monotonic() - started, "error")
+                if (not transient_error(e) or transient >= self.transient_retries
+                        or not self._backoff(transient)):
+                    raise
+                transient += 1
+                continue
+            pool.release(lane, time.monotonic() - started, "ok")
+            return result
+
+    def stream(self, model: str, lane: str, fn):
+        """
+        Like call(), for a streamed response: the permit is held until the
+        stream ends. 429s and transient errors are only retried before the
+        first chunk arrives.
+        """
+        pool = self.pool(model)
+        throttled = transient = 0
+        while True:
+            self._acquire(pool, lane)
+            started = time.monotonic()
+            first_chunk = None
+            outcome, retry_after = "ok", None
+            try:
+                for chunk in fn():
+                    if first_chunk is None:
+                        first_chunk = time.monotonic() - started
+                    remaining = _remaining()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"The step ran out of time while streaming ({pool.name}).")
+                    yield chunk
+                return
+            except Exception as e:
+                error = e
+                retry_after = throttle_delay(e)
+                outcome = "error" if retry_after is None else "throttled"
+                if first_chunk is not None:
+                    raise
+                if retry_after is not None:
+                    throttled += 1
+                    if throttled > self.max_retries:
+                        raise
+                elif not transient_error(e) or transient >= self.transient_retries:
+                    raise
+            finally:
+                latency = first_chunk if first_chunk is not None else time.monotonic() - started
+                pool.release(lane, latency, outcome, retry_after)
+            # Throttled calls wait out Retry-After in _acquire(); transient errors back off here
+            if outcome == "error":
+                if not self._backoff(transient):
+                    raise error
+                transient += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            pools = dict(self._pools)
+        return {model: pool.stats() for model, pool in pools.items()}
+
+
+# Process-wide limiter used by agents/*.py
+llm_limiter = LLMLimiter()
@@ -0,0 +1,144 @@
+"""
+services/memory.py - Memory Accounting
+Process RSS plus tracemalloc-based per-request accounting for workflow runs.
+Tracing only starts when MEMORY_TRACKING=true (or start() is called).
+"""
+
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+from config import MEMORY_TRACKING, MEMORY_TRACE_FRAMES
+
+
+def rss_kb() -> dict:
+    """Current and peak resident set size of this process, in KB."""
+    current = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        pass
+    return {
+        "rss_kb": current,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,  # KB on Linux
+    }
+
+
+class MemoryTracker:
+    """
+    Records how much traced memory each request allocated and kept.
+
+    - retained_kb: traced memory still held when the request finished
+      (process-wide, so concurrent requests blur into each other)
+    - peak_kb: traced peak above the starting point; only measured for
+      requests that ran alone, since the tracemalloc peak is process-wide
+    """
+
+    def __init__(self, enabled: bool = MEMORY_TRACKING, frames: int = MEMORY_TRACE_FRAMES,
+                 history: int = 500):
+        self.frames = frames
+        self.requests = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._active = set()
+        self._overlapped = set()  # Active requests that shared their run with another
+        if enabled:
+            self.start()
+
+    @property
+    def enabled(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+
+    @contextmanager
+    def track(self, label: str):
+        """Account for the memory used inside the block (no-op when tracing is off)."""
+        if not self.enabled:
+            yield
+            return
+
+        token = object()
+        with self._lock:
+            if self._active:
+                self._overlapped.update(self._active)
+                self._overlapped.add(token)
+            else:
+                tracemalloc.reset_peak()
+            self._active.add(token)
+            start, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                self._active.discard(token)
+                alone = token not in self._overlapped
+                self._overlapped.discard(token)
+                self.requests.append({
+                    "label": label,
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "retained_kb": round((current - start) / 1024, 1),
+                    "peak_kb": round((peak - start) / 1024, 1) if alone else None,
+                })
+
+    def top_allocations(self, limit: int = 15) -> list:
+        """Allocation sites holding the most traced memory right now."""
+        if not self.enabled:
+            return []
+        stats = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        )).statistics("lineno")
+        return [
+            {"site": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in stats[:limit]
+        ]
+
+    def snapshot(self, top: int = 15) -> dict:
+        """Process memory, traced totals and per-request aggregates."""
+        report = rss_kb()
+        report["tracing"] = self.enabled
+        if not self.enabled:
+            return report
+
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            requests = list(self.requests)
+            in_flight = len(self._active)
+        retained = sorted(r["retained_kb"] for r in requests)
+        peaks = sorted(r["peak_kb"] for r in requests if r["peak_kb"] is not None)
+
+        def pct(values, q):
+            return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+        report.update({
+            "traced_kb": round(current / 1024, 1),
+            "traced_peak_kb": round(peak / 1024, 1),
+            "in_flight": in_flight,
+            "requests": {
+                "count": len(requests),
+                "retained_kb_p50": pct(retained, 0.5),
+                "retained_kb_p95": pct(retained, 0.95),
+                "peak_kb_p50": pct(peaks, 0.5),
+                "peak_kb_p95": pct(peaks, 0.95),
+                "peak_kb_max": peaks[-1] if peaks else None,
+                "recent": requests[-10:],
+            },
+            "top_allocations": self.top_allocations(top),
+        })
+        return report
+
+
+# Process-wide tracker used by the workflow and /metrics/memory
+memory_tracker = MemoryTracker()
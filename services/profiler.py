@@ -0,0 +1,162 @@
+"""
+services/profiler.py - Sampling Profiler
+Low-overhead wall-clock sampler built on sys._current_frames().
+Produces collapsed stacks (flamegraph.pl / speedscope input) and a
+per-function self/total table. Nothing runs unless a session is started.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from config import PROFILER_INTERVAL_MS
+
+# Leaf frames that mean "this thread is parked" (file name, function name);
+# such samples are dropped unless include_idle=True
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+}
+
+
+def _frame_label(code) -> str:
+    """Short "function (file:line)" label for a code object."""
+    filename = code.co_filename
+    for marker in ("site-packages" + os.sep, os.getcwd() + os.sep, "lib" + os.sep):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread (except its own) every `interval_ms`
+    while `should_sample()` returns True. Parked threads are skipped unless
+    include_idle is set.
+    """
+
+    def __init__(self, interval_ms: float = PROFILER_INTERVAL_MS, should_sample=None,
+                 include_idle: bool = False):
+        self.interval = interval_ms / 1000
+        self.should_sample = should_sample or (lambda: True)
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self._labels = {}  # code object -> label (labels are built once per function)
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+        self.stopped_at = None
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.stopped_at = time.time()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if not self.should_sample():
+                continue
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if not self.include_idle and (
+                    (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+                ):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = self._labels.get(code)
+                    if label is None:
+                        label = self._labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks: "root;caller;leaf count" per line."""
+        return "\n".join(
+            f"{';'.join(stack)} {count}"
+            for stack, count in self.stacks.most_common()
+        )
+
+    def top(self, limit: int = 30) -> list:
+        """Functions ranked by self samples, with total (inclusive) samples."""
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+
+        all_samples = sum(self.stacks.values()) or 1
+        return [
+            {
+                "function": label,
+                "self": own[label],
+                "total": total[label],
+                "self_pct": round(100 * own[label] / all_samples, 1),
+                "total_pct": round(100 * total[label] / all_samples, 1),
+            }
+            for label, _ in own.most_common(limit)
+        ]
+
+    def report(self, limit: int = 30) -> dict:
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "duration_seconds": round((self.stopped_at or time.time()) - self.started_at, 3),
+            "top": self.top(limit),
+            "collapsed": self.collapsed(),
+        }
+
+
+class RequestProfileSession:
+    """
+    Profiles the next `count` requests whose path starts with `path`.
+    Sampling only happens while at least one matching request is in flight
+    (all threads are sampled, since LangGraph runs nodes on worker threads).
+    """
+
+    def __init__(self, count: int, path: str = "/", interval_ms: float = PROFILER_INTERVAL_MS):
+        self.remaining = count
+        self.path = path
+        self.finished = threading.Event()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.profiler = SamplingProfiler(interval_ms, should_sample=lambda: self._in_flight > 0)
+
+    def matches(self, path: str) -> bool:
+        return not self.finished.is_set() and path.startswith(self.path)
+
+    def request_started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self.finished.set()
+
+
+# The armed request session, if any (checked by the HTTP middleware)
+active_request_session = None
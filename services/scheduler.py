@@ -0,0 +1,384 @@
+"""
+services/scheduler.py - Deferred Message Scheduler
+Persists reminders and scheduled emails in SQLite and fires them when due.
+A single asyncio dispatcher (in a daemon thread) sleeps until the earliest
+due time in an in-memory heap. Only jobs due within SCHEDULER_HORIZON are
+held in memory; later ones are loaded from the due-time index as they come
+into range, so the store survives restarts and can hold any number of jobs.
+"""
+
+import asyncio
+import heapq
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    SCHEDULER_DB_PATH,
+    SCHEDULER_HORIZON,
+    SCHEDULER_REFILL_INTERVAL,
+    SCHEDULER_BATCH_SIZE,
+    SCHEDULER_SEND_WORKERS,
+    SCHEDULER_MAX_ATTEMPTS,
+    SCHEDULER_RETRY_DELAY,
+    SCHEDULER_CLAIM_TIMEOUT,
+)
+
+
+def default_senders() -> dict:
+    """Outbound senders by job kind: payload dict in, raises on failure."""
+    from services.email_engine import email_engine
+    from services.whatsapp import WhatsAppSender
+
+    whatsapp = WhatsAppSender()
+    return {
+        "whatsapp": lambda payload: whatsapp.send(payload["to"], payload["body"]),
+        # Sent synchronously: the job is only deleted once the SMTP server accepted it
+        "email": lambda payload: email_engine.send_now(
+            to=payload["to"], subject=payload.get("subject", ""), body=payload["body"]
+        ),
+    }
+
+
+class Scheduler:
+    """
+    Job states: pending → firing → (deleted once sent) | pending (retry) | failed.
+
+    schedule() may be called from any thread or process sharing the database.
+    Jobs scheduled in this process are added to the heap right away; jobs
+    from other processes are picked up every SCHEDULER_REFILL_INTERVAL.
+    Claims are guarded in SQL, so several dispatchers never fire the same job.
+    """
+
+    def __init__(self, path: str = SCHEDULER_DB_PATH, senders: dict = None,
+                 horizon: float = SCHEDULER_HORIZON,
+                 refill_interval: float = SCHEDULER_REFILL_INTERVAL,
+                 batch_size: int = SCHEDULER_BATCH_SIZE,
+                 send_workers: int = SCHEDULER_SEND_WORKERS,
+                 max_attempts: int = SCHEDULER_MAX_ATTEMPTS):
+        self.path = path
+        self.senders = senders
+        self.horizon = horizon
+        self.refill_interval = refill_interval
+        self.batch_size = batch_size
+        self.send_workers = send_workers
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+        # Loop-thread state
+        self._heap = []         # (due_at, job id); stale entries are skipped
+        self._queued = {}       # job id -> due_at it is queued under
+        self._loaded_until = 0.0
+        self._max_seen_id = 0
+        self._next_refill = 0.0
+        self._wake = None
+
+        self._loop = None
+        self._pool = None
+        self._start_lock = threading.Lock()
+        self.started_at = None
+        self.fired = 0
+        self.failed = 0
+
+        self._conn().executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                due_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_at REAL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS scheduled_jobs_due ON scheduled_jobs (status, due_at);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -------------------------------------------------------------------------
+    # Public API (thread-safe)
+    # -------------------------------------------------------------------------
+
+    def schedule(self, kind: str, payload: dict, due_at: float) -> int:
+        """
+        Store a job to fire at `due_at` (unix time).
+
+        Args:
+            kind: Sender to use ("whatsapp" or "email")
+            payload: Sender data, e.g. {"to", "body"} (plus "subject" for email)
+            due_at: When to send
+
+        Returns:
+            The job id
+        """
+        return self.schedule_many([(kind, payload, due_at)])[0]
+
+    def schedule_many(self, jobs: list) -> list:
+        """Store several (kind, payload, due_at) jobs in one transaction."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [
+                conn.execute(
+                    "INSERT INTO scheduled_jobs (kind, payload, due_at, created_at) VALUES (?, ?, ?, ?)",
+                    (kind, json.dumps(payload), due_at, now),
+                ).lastrowid
+                for kind, payload, due_at in jobs
+            ]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if self._loop is not None:
+            entries = [(due_at, job_id) for job_id, (_, _, due_at) in zip(ids, jobs)]
+            self._loop.call_soon_threadsafe(self._add, entries)
+        return ids
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a pending job. Returns True if it had not fired yet."""
+        cur = self._conn().execute(
+            "DELETE FROM scheduled_jobs WHERE id = ? AND status = 'pending'", (job_id,)
+        )
+        return cur.rowcount == 1
+
+    def pending(self, to: str = None, limit: int = 20) -> list:
+        """Upcoming jobs, soonest first (optionally only those sent to `to`)."""
+        query = "SELECT id, kind, payload, due_at FROM scheduled_jobs WHERE status = 'pending'"
+        params = ()
+        if to is not None:
+            query += " AND json_extract(payload, '$.to') = ?"
+            params = (to,)
+        rows = self._conn().execute(query + " ORDER BY due_at LIMIT ?", (*params, limit)).fetchall()
+        return [
+            {"id": job_id, "kind": kind, "payload": json.loads(payload), "due_at": due_at}
+            for job_id, kind, payload, due_at in rows
+        ]
+
+    def stats(self) -> dict:
+        """Job counts per status plus what this process has fired."""
+        counts = dict(self._conn().execute(
+            "SELECT status, COUNT(*) FROM scheduled_jobs GROUP BY status"
+        ).fetchall())
+        elapsed = time.time() - self.started_at if self.started_at else 0
+        return {
+            "pending": counts.get("pending", 0),
+            "firing": counts.get("firing", 0),
+            "failed": counts.get("failed", 0),
+            "in_memory": len(self._queued),
+            "fired": self.fired,
+            "fire_errors": self.failed,
+            "fired_per_second": round(self.fired / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def start(self) -> None:
+        """Start the dispatcher in a daemon thread (idempotent)."""
+        if self._loop is not None:
+            return
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            if self.senders is None:
+                self.senders = default_senders()
+            self._pool = ThreadPoolExecutor(max_workers=self.send_workers, thread_name_prefix="scheduler")
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._wake = asyncio.Event()
+                loop.create_task(self._dispatch())
+                ready.set()
+                loop.run_forever()
+
+            threading.Thread(target=run, name="scheduler", daemon=True).start()
+            ready.wait()
+            self.started_at = time.time()
+            self._loop = loop
+
+    # -------------------------------------------------------------------------
+    # Dispatcher (loop thread only)
+    # -------------------------------------------------------------------------
+
+    def _add(self, entries: list) -> None:
+        """Queue jobs due within the loaded range; later ones load with the horizon."""
+        earliest = self._heap[0][0] if self._heap else None
+        for due_at, job_id in entries:
+            if due_at <= self._loaded_until and self._queued.get(job_id) != due_at:
+                self._queued[job_id] = due_at
+                heapq.heappush(self._heap, (due_at, job_id))
+        if self._heap and (earliest is None or self._heap[0][0] < earliest):
+            self._wake.set()
+
+    async def _dispatch(self) -> None:
+        failures = 0
+        while True:
+            try:
+                await self._dispatch_once()
+                failures = 0
+            except Exception as e:
+                # e.g. "database is locked": keep the only dispatcher alive
+                failures += 1
+                delay = min(60, 2 ** failures)
+                print(f"⚠️  Scheduler error, retrying in {delay}s: {e}")
+                # Jobs popped before the error are no longer in the heap; reload
+                # everything in range from the database on the next pass
+                self._loaded_until = 0.0
+                self._max_seen_id = 0
+                self._next_refill = 0.0
+                await asyncio.sleep(delay)
+
+    async def _dispatch_once(self) -> None:
+        """Refill if due, then fire one batch of due jobs or sleep until the next one."""
+        now = time.time()
+        if now >= self._next_refill:
+            self._refill(now)
+
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            due_at, job_id = heapq.heappop(self._heap)
+            if self._queued.get(job_id) == due_at:
+                del self._queued[job_id]
+                due.append(job_id)
+        if due:
+            await self._fire(due, now)
+            return
+
+        wake_at = self._next_refill
+        if self._heap:
+            wake_at = min(wake_at, self._heap[0][0])
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, wake_at - time.time()))
+        except asyncio.TimeoutError:
+            pass
+
+    def _refill(self, now: float) -> None:
+        """
+        Load pending jobs that came into range: new rows (any process), rows
+        inside the extended horizon, and rows whose claim went stale.
+        """
+        until = now + self.horizon
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "UPDATE scheduled_jobs SET status = 'pending', claimed_at = NULL "
+                "WHERE status = 'firing' AND claimed_at < ? RETURNING id, due_at",
+                (now - SCHEDULER_CLAIM_TIMEOUT,),
+            ).fetchall()
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM scheduled_jobs").fetchone()[0]
+            # Each query walks its own index range, so idle refills stay cheap
+            rows += conn.execute(
+                "SELECT id, due_at FROM scheduled_jobs "
+                "WHERE id > ? AND status = 'pending' AND due_at <= ?",
+                (self._max_seen_id, until),
+            ).fetchall()
+            rows += conn.execute(
+                "SELECT id, due_at FROM scheduled_jobs "
+                "WHERE status = 'pending' AND due_at > ? AND due_at <= ?",
+                (self._loaded_until, until),
+            ).fetchall()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._max_seen_id = max_id
+        self._loaded_until = until
+        self._next_refill = now + self.refill_interval
+        self._add([(due_at, job_id) for job_id, due_at in rows])
+
+    async def _fire(self, job_ids: list, now: float) -> None:
+        jobs = self._claim(job_ids, now)
+        loop = asyncio.get_running_loop()
+        errors = await asyncio.gather(*(
+            loop.run_in_executor(self._pool, self._send, kind, payload)
+            for _, kind, payload, _ in jobs
+        ))
+        self._finish(jobs, errors)
+
+    def _claim(self, job_ids: list, now: float) -> list:
+        """Mark jobs as firing; returns (id, kind, payload, attempts) for those still due."""
+        placeholders = ",".join("?" * len(job_ids))
+        rows = self._conn().execute(
+            f"UPDATE scheduled_jobs SET status = 'firing', claimed_at = ?, attempts = attempts + 1 "
+            f"WHERE id IN ({placeholders}) AND status = 'pending' AND due_at <= ? "
+            "RETURNING id, kind, payload, attempts",
+            (now, *job_ids, now),
+        ).fetchall()
+        return [(job_id, kind, json.loads(payload), attempts) for job_id, kind, payload, attempts in rows]
+
+    def _send(self, kind: str, payload: dict) -> str:
+        """Send one job; returns the error text, or None on success."""
+        sender = self.senders.get(kind)
+        if sender is None:
+            return f"No sender for job kind '{kind}'"
+        try:
+            sender(payload)
+            return None
+        except Exception as e:
+            return str(e) or type(e).__name__
+
+    def _finish(self, jobs: list, errors: list) -> None:
+        now = time.time()
+        sent, retries, dead = [], [], []
+        for (job_id, _, _, attempts), error in zip(jobs, errors):
+            if error is None:
+                sent.append((job_id,))
+            elif attempts < self.max_attempts:
+                due_at = now + SCHEDULER_RETRY_DELAY * 2 ** (attempts - 1)
+                retries.append((due_at, error, job_id))
+            else:
+                dead.append((error, job_id))
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM scheduled_jobs WHERE id = ?", sent)
+            conn.executemany(
+                "UPDATE scheduled_jobs SET status = 'pending', claimed_at = NULL, due_at = ?, last_error = ? "
+                "WHERE id = ?",
+                retries,
+            )
+            conn.executemany(
+                "UPDATE scheduled_jobs SET status = 'failed', last_error = ? WHERE id = ?", dead
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self.fired += len(sent)
+        self.failed += len(retries) + len(dead)
+        for error, job_id in dead:
+            print(f"⚠️  Scheduled job {job_id} failed for good: {error}")
+        self._add([(due_at, job_id) for due_at, _, job_id in retries])
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Return the process-wide scheduler (its dispatcher is started by main.py / worker.py)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = Scheduler()
+    return _scheduler
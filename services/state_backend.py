@@ -0,0 +1,347 @@
+"""
+services/state_backend.py - Shared State Backend
+One key/value interface for caches, dedupe records and rate-limit counters,
+with three implementations:
+- memory: process-local (single worker, tests)
+- sqlite: shared by every worker on one host (put the file on /dev/shm for speed)
+- redis:  shared across hosts (any Redis-protocol server, or fakeredis in tests)
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import STATE_BACKEND, STATE_SQLITE_PATH, STATE_MEMORY_MAX_KEYS, REDIS_URL
+
+# Check if the Redis client is available
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class StateBackend:
+    """
+    Interface shared by all backends. Values are strings; ttl is in seconds
+    (None = no expiry).
+    """
+
+    def get(self, key: str):
+        """Return the value for key, or None if missing/expired."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        """Store a value."""
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl: float = None) -> bool:
+        """Store a value only if the key does not exist. Returns True if stored."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove a key (no error if it is missing)."""
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        """
+        Atomically add to an integer counter and return the new value.
+        The ttl only applies when the counter is created.
+        """
+        raise NotImplementedError
+
+    def get_many(self, keys: list) -> list:
+        """Values for several keys in one round trip (None for missing keys)."""
+        return [self.get(key) for key in keys]
+
+    def set_many(self, mapping: dict, ttl: float = None) -> None:
+        """Store several values in one round trip."""
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+
+# =============================================================================
+# IN-MEMORY BACKEND
+# =============================================================================
+
+class MemoryBackend(StateBackend):
+    """Process-local backend; evicts the least recently used keys past max_keys."""
+
+    def __init__(self, max_keys: int = STATE_MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, value: str, ttl: float = None) -> None:
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry else None
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: str, ttl: float = None) -> bool:
+        with self._lock:
+            if self._live(key):
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        with self._lock:
+            entry = self._live(key)
+            if entry:
+                value = int(entry[0]) + amount
+                self._data[key] = (str(value), entry[1])
+            else:
+                value = amount
+                self._store(key, str(value), ttl)
+            return value
+
+    def get_many(self, keys: list) -> list:
+        with self._lock:
+            return [entry[0] if entry else None for entry in map(self._live, keys)]
+
+    def set_many(self, mapping: dict, ttl: float = None) -> None:
+        with self._lock:
+            for key, value in mapping.items():
+                self._store(key, value, ttl)
+
+
+# =============================================================================
+# SQLITE BACKEND
+# =============================================================================
+
+class SQLiteBackend(StateBackend):
+    """
+    Single-host backend shared by all worker processes through one SQLite
+    file in WAL mode. Each thread gets its own connection.
+    """
+
+    PURGE_EVERY = 1000  # Writes between sweeps of expired rows
+
+    def __init__(self, path: str = STATE_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._conn().executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS kv (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            );
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _written(self, count: int = 1) -> None:
+        with self._writes_lock:
+            self._writes += count
+            purge = self._writes >= self.PURGE_EVERY
+            if purge:
+                self._writes = 0
+        if purge:
+            self._conn().execute(
+                "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+
+    @staticmethod
+    def _expiry(ttl: float):
+        return time.time() + ttl if ttl else None
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, self._expiry(ttl)),
+        )
+        self._written()
+
+    def add(self, key: str, value: str, ttl: float = None) -> bool:
+        now = time.time()
+        cur = self._conn().execute(
+            """
+            INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+            WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?
+            """,
+            (key, value, self._expiry(ttl), now),
+        )
+        self._written()
+        return cur.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        now = time.time()
+        row = self._conn().execute(
+            """
+            INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = CASE WHEN kv.expires_at IS NOT NULL AND kv.expires_at <= ?
+                             THEN excluded.value
+                             ELSE CAST(CAST(kv.value AS INTEGER) + ? AS TEXT) END,
+                expires_at = CASE WHEN kv.expires_at IS NOT NULL AND kv.expires_at <= ?
+                                  THEN excluded.expires_at
+                                  ELSE kv.expires_at END
+            RETURNING value
+            """,
+            (key, str(amount), self._expiry(ttl), now, amount, now),
+        ).fetchone()
+        self._written()
+        return int(row[0])
+
+    def get_many(self, keys: list) -> list:
+        if not keys:
+            return []
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn().execute(
+            f"SELECT key, value FROM kv WHERE key IN ({placeholders}) "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (*keys, time.time()),
+        ).fetchall()
+        found = dict(rows)
+        return [found.get(key) for key in keys]
+
+    def set_many(self, mapping: dict, ttl: float = None) -> None:
+        expires_at = self._expiry(ttl)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key, value in mapping.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._written(len(mapping))
+
+
+# =============================================================================
+# REDIS BACKEND
+# =============================================================================
+
+class RedisBackend(StateBackend):
+    """
+    Cluster-wide backend for any Redis-protocol server.
+    Pass `client` to use an existing client (e.g. fakeredis.FakeRedis in tests).
+    """
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("The redis state backend requires redis. Install with: pip install redis")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+
+    @staticmethod
+    def _text(value):
+        return value.decode() if isinstance(value, bytes) else value
+
+    def get(self, key: str):
+        return self._text(self.client.get(key))
+
+    def set(self, key: str, value: str, ttl: float = None) -> None:
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key: str, value: str, ttl: float = None) -> bool:
+        return bool(self.client.set(key, value, px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        pipe = self.client.pipeline()
+        if ttl:
+            # Creates the counter with its expiry; a no-op if it already exists
+            pipe.set(key, 0, px=int(ttl * 1000), nx=True)
+        pipe.incrby(key, amount)
+        return int(pipe.execute()[-1])
+
+    def get_many(self, keys: list) -> list:
+        if not keys:
+            return []
+        return [self._text(value) for value in self.client.mget(keys)]
+
+    def set_many(self, mapping: dict, ttl: float = None) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(key, value, px=int(ttl * 1000) if ttl else None)
+        pipe.execute()
+
+
+# =============================================================================
+# FACTORY
+# =============================================================================
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_state_backend(kind: str = STATE_BACKEND) -> StateBackend:
+    """Build a backend by name: "memory", "sqlite" or "redis"."""
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend()
+    if kind == "redis":
+        return RedisBackend()
+    raise ValueError(f"Unknown STATE_BACKEND: {kind} (use memory, sqlite or redis)")
+
+
+def get_state_backend() -> StateBackend:
+    """Return the process-wide backend selected by STATE_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_state_backend()
+    return _backend
+
+
+def reset_state_backend() -> None:
+    """Forget the process-wide backend so the next call builds a fresh one (replays, tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = None
@@ -0,0 +1,205 @@
+"""
+services/streaming.py - Streaming Reply Delivery
+Splits a token stream into WhatsApp-sized messages at paragraph/sentence
+boundaries and sends each one, in order, as soon as it is complete.
+"""
+
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+from config import WHATSAPP_MAX_CHARS, STREAM_MIN_CHUNK_CHARS
+
+
+# Sentence end: punctuation, optional closing quote/bracket, then whitespace
+SENTENCE_END = re.compile(r"[.!?][\"')\]*]*\s")
+
+# Metrics of the most recent streamed deliveries (newest last)
+recent_deliveries = deque(maxlen=100)
+
+
+class MessageChunker:
+    """
+    Incrementally cuts text into chunks of at most max_chars.
+    
+    A chunk is released at the last paragraph break once at least min_chars
+    are buffered. If the buffer outgrows max_chars it is cut at the last
+    paragraph, sentence or word boundary that fits.
+    """
+    
+    def __init__(self, max_chars: int = WHATSAPP_MAX_CHARS, min_chars: int = STREAM_MIN_CHUNK_CHARS):
+        self.max_chars = max_chars
+        self.min_chars = min(min_chars, max_chars)
+        self.buffer = ""
+    
+    def feed(self, text: str) -> list:
+        """Add text and return any chunks that are now complete."""
+        self.buffer += text
+        chunks = []
+        
+        cut = self._find_cut()
+        while cut:
+            chunk = self.buffer[:cut].strip()
+            self.buffer = self.buffer[cut:].lstrip()
+            if chunk:
+                chunks.append(chunk)
+            cut = self._find_cut()
+        
+        return chunks
+    
+    def flush(self) -> list:
+        """Return whatever is left in the buffer as final chunk(s)."""
+        chunks = []
+        while self.buffer.strip():
+            cut = self._find_cut() or len(self.buffer)
+            chunk = self.buffer[:cut].strip()
+            self.buffer = self.buffer[cut:].lstrip()
+            if chunk:
+                chunks.append(chunk)
+        self.buffer = ""
+        return chunks
+    
+    def _find_cut(self) -> int:
+        """Index to cut the buffer at, or 0 if no chunk is ready yet."""
+        buffer = self.buffer
+        
+        if len(buffer) > self.max_chars:
+            window = buffer[:self.max_chars]
+            pos = window.rfind("\n\n")
+            if pos > 0:
+                return pos + 2
+            sentences = list(SENTENCE_END.finditer(window))
+            if sentences:
+                return sentences[-1].end()
+            pos = max(window.rfind(" "), window.rfind("\n"))
+            if pos > 0:
+                return pos + 1
+            return self.max_chars
+        
+        if len(buffer) >= self.min_chars:
+            pos = buffer.rfind("\n\n")
+            if pos >= self.min_chars:
+                return pos + 2
+        
+        return 0
+
+
+def split_message(text: str, max_chars: int = WHATSAPP_MAX_CHARS) -> list:
+    """
+    Split a finished reply into as few messages as possible, each under max_chars.
+    """
+    chunker = MessageChunker(max_chars=max_chars, min_chars=max_chars)
+    return chunker.feed(text) + chunker.flush()
+
+
+class StreamingDelivery:
+    """
+    Feeds LLM tokens through a MessageChunker and sends complete chunks from a
+    single background thread, so messages go out in order while generation
+    continues.
+    """
+    
+    def __init__(self, send, to: str, chunker: MessageChunker = None):
+        """
+        Args:
+            send: Callable (to, body) that sends one message
+            to: Recipient address
+            chunker: Optional custom chunker
+        """
+        self.send = send
+        self.to = to
+        self.chunker = chunker or MessageChunker()
+        self.started_at = time.perf_counter()
+        self.streamed = False
+        self.chunks = []  # (index, chars, seconds since start when sent)
+        self.error = None  # First send failure; later chunks are not sent
+        
+        self._fed = []  # Text streamed so far
+        self._closed = False  # Set by finish()/abort(); later feed() calls are ignored
+        self._lock = threading.Lock()  # A timed-out writer may still feed() while finish() flushes
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._thread.start()
+    
+    def feed(self, text: str) -> None:
+        """Consume a piece of the token stream (no-op once finish() has started)."""
+        with self._lock:
+            if self._closed:
+                return
+            self.streamed = True
+            self._fed.append(text)
+            for chunk in self.chunker.feed(text):
+                self._queue.put(chunk)
+    
+    def finish(self, final_text: str = "", error: str = "") -> dict:
+        """
+        Flush the remaining text and wait until every chunk is sent.
+        
+        Args:
+            final_text: Full reply; sent in chunks if nothing was streamed, or
+                after the streamed text if it differs from it (e.g. a timeout notice)
+            error: Message for a failed run, sent after whatever was streamed
+            
+        Returns:
+            Delivery metrics (see metrics())
+        """
+        with self._lock:
+            self._closed = True
+            streamed_text = "".join(self._fed)
+            chunks = self.chunker.flush() if self.streamed else []
+        if not self.streamed or (final_text and final_text.strip() != streamed_text.strip()):
+            chunks += split_message(final_text, self.chunker.max_chars) if final_text else []
+        if error:
+            chunks += split_message(error, self.chunker.max_chars)
+        for chunk in chunks:
+            self._queue.put(chunk)
+        
+        self._queue.put(None)
+        self._thread.join()
+        
+        metrics = self.metrics()
+        recent_deliveries.append(metrics)
+        print(
+            f"📤 Delivered {metrics['chunks']} message(s) to {self.to}: "
+            f"first after {metrics['time_to_first_message']}s, "
+            f"last after {metrics['time_to_last_message']}s"
+        )
+        return metrics
+    
+    def abort(self) -> None:
+        """Stop the sender thread without sending the text still being buffered."""
+        with self._lock:
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+    
+    def metrics(self) -> dict:
+        """Chunk latency metrics, in seconds since the delivery started."""
+        latencies = [latency for _, _, latency in self.chunks]
+        return {
+            "streamed": self.streamed,
+            "chunks": len(self.chunks),
+            "chars": sum(chars for _, chars, _ in self.chunks),
+            "time_to_first_message": round(latencies[0], 3) if latencies else None,
+            "time_to_last_message": round(latencies[-1], 3) if latencies else None,
+            "chunk_latencies": [round(latency, 3) for latency in latencies],
+            "error": self.error,
+        }
+    
+    def _send_loop(self) -> None:
+        """Send queued chunks one at a time, preserving order."""
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self.error:
+                continue  # A reply with a missing middle part is worse than a late one
+            try:
+                self.send(self.to, chunk)
+            except Exception as e:
+                self.error = str(e) or type(e).__name__
+                print(f"⚠️  Failed to send chunk {len(self.chunks) + 1} to {self.to}: {e}")
+                continue
+            self.chunks.append((len(self.chunks) + 1, len(chunk), time.perf_counter() - self.started_at))
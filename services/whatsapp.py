@@ -0,0 +1,42 @@
+"""
+services/whatsapp.py - Outbound WhatsApp Sender
+Sends WhatsApp messages through the Twilio REST API (outside of a webhook reply).
+"""
+
+from twilio.rest import Client
+
+from config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_FROM, TWILIO_API_BASE
+
+
+class WhatsAppSender:
+    """
+    Thin wrapper around the Twilio client for outbound WhatsApp messages.
+    """
+    
+    def __init__(self):
+        self.client = None
+        if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
+            self.client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+            self.client.api.base_url = TWILIO_API_BASE
+    
+    @property
+    def enabled(self) -> bool:
+        """True when Twilio credentials are configured."""
+        return self.client is not None
+    
+    def send(self, to: str, body: str) -> str:
+        """
+        Send one WhatsApp message.
+        
+        Args:
+            to: Recipient (e.g., whatsapp:+1234567890)
+            body: Message text (must fit in one WhatsApp message)
+            
+        Returns:
+            The Twilio message SID
+        """
+        if not self.enabled:
+            raise RuntimeError("Outbound WhatsApp requires TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN")
+        
+        message = self.client.messages.create(from_=TWILIO_WHATSAPP_FROM, to=to, body=body)
+        return message.sid
@@ -1,11 +1,24 @@
 """
 tools/__init__.py - Tools Package
 Exports all tools for easy importing.
+Tool modules are imported lazily, on first attribute access.
 """
 
-from tools.calculator import calculator
-from tools.search import web_search
-from tools.file_ops import create_docx, save_text_file
-from tools.email_sender import email_sender
+import importlib
 
-__all__ = ["calculator", "web_search", "create_docx", "save_text_file", "email_sender"]
+_EXPORTS = {
+    "calculator": "tools.calculator",
+    "web_search": "tools.search",
+    "create_docx": "tools.file_ops",
+    "save_text_file": "tools.file_ops",
+    "email_sender": "tools.email_sender",
+    "set_reminder": "tools.reminder",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module 'tools' has no attribute {name!r}")
@@ -37,3 +37,12 @@ def calculator(expression: str) -> float:
         raise ValueError(f"Expression did not return a number: {expression}")
 
     return float(result)
+
+
+def run_step(step: dict, context: dict) -> str:
+    """Executor step handler: evaluate the step input."""
+    try:
+        result = calculator.invoke({"expression": step.get("input", "")})
+        return f"The result of your calculation is: {result}"
+    except Exception as e:
+        return f"Calculator error: {e}"
@@ -1,29 +1,59 @@
 """
 tools/email_sender.py - Email Sender Tool
-Placeholder for sending/scheduling emails.
+Queues emails on the outbound email engine (SMTP), schedules them for later
+through the scheduler, or returns a draft when no SMTP server is configured.
 """
 
+import re
+
 from langchain_core.tools import tool
 
+from config import SCHEDULER_ENABLED, SMTP_HOST
+from services.email_engine import email_engine
+from services.scheduler import get_scheduler
+from tools.reminder import parse_when
+
+
+EMAIL_ADDRESS = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
 
 @tool
-def email_sender(email_body: str, recipient: str = "", subject: str = "") -> str:
+def email_sender(email_body: str, recipient: str = "", subject: str = "", send_at: str = "") -> str:
     """
-    Send or schedule an email (placeholder - integrate with Gmail/SendGrid/etc.)
+    Send or schedule an email through the outbound email engine.
+    Delivery happens in the background; this only queues the message.
     
     Args:
         email_body: The body text of the email
         recipient: Email recipient address
         subject: Email subject line
+        send_at: When to send, e.g. "tomorrow at 9" (empty = now)
         
     Returns:
         Status message about the email
     """
-    # This is a placeholder - you can integrate with:
-    # - Gmail API
-    # - SendGrid
-    # - AWS SES
-    # - Any SMTP server
+    due = None
+    if send_at:
+        if not SCHEDULER_ENABLED:
+            return "📧 Email not sent: scheduled sending is turned off. Send it now or try again later."
+        due = parse_when(send_at)[0]
+        if due is None:
+            return f"📧 Email not sent: could not understand the send time '{send_at}'. Try e.g. 'tomorrow at 9'."
+    if SMTP_HOST and recipient and due:
+        get_scheduler().schedule(
+            "email",
+            {"to": recipient, "subject": subject or "(no subject)", "body": email_body},
+            due.timestamp()
+        )
+        return f"📧 Email to {recipient} scheduled for {due:%Y-%m-%d %H:%M %Z}."
+    
+    if SMTP_HOST and recipient:
+        message_id = email_engine.enqueue(
+            to=recipient,
+            subject=subject or "(no subject)",
+            body=email_body
+        )
+        return f"📧 Email to {recipient} queued for delivery (id: {message_id})."
     
     result = f"""📧 Email Draft Ready:
     
@@ -33,6 +63,42 @@ Subject: {subject if subject else '[no subject]'}
 {email_body}
 
 ---
-⚠️ Note: This is a placeholder. Integrate with an email service to actually send."""
+⚠️ Note: Not sent. {'Add a recipient address to send it.' if SMTP_HOST else 'Set SMTP_HOST to actually send emails.'}"""
     
     return result
+
+
+def _split_headers(text: str) -> tuple:
+    """Pull "To:" / "Subject:" / "Send at:" header lines off the top of a drafted email."""
+    recipient, subject, send_at, body_lines = "", "", "", []
+    for line in text.splitlines():
+        lowered = line.strip().lower()
+        if not body_lines and lowered.startswith("to:") and not recipient:
+            match = EMAIL_ADDRESS.search(line)
+            recipient = match.group(0) if match else ""
+        elif not body_lines and lowered.startswith("subject:") and not subject:
+            subject = line.split(":", 1)[1].strip()
+        elif not body_lines and lowered.startswith("send at:") and not send_at:
+            send_at = line.split(":", 1)[1].strip()
+        elif body_lines or line.strip():
+            body_lines.append(line)
+    return recipient, subject, send_at, "\n".join(body_lines)
+
+
+def run_step(step: dict, context: dict) -> str:
+    """
+    Executor step handler: send the step input as an email.
+    The recipient, subject and send time come from "To:"/"Subject:"/"Send at:"
+    lines in the input; the recipient may also be mentioned in the step description.
+    """
+    recipient, subject, send_at, body = _split_headers(step.get("input", ""))
+    if not recipient:
+        match = EMAIL_ADDRESS.search(step.get("description", ""))
+        recipient = match.group(0) if match else ""
+    
+    return email_sender.invoke({
+        "email_body": body,
+        "recipient": recipient,
+        "subject": subject,
+        "send_at": send_at
+    })
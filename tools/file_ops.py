@@ -95,3 +95,14 @@ def save_text_file(content: str, filename: str, extension: str = "txt") -> str:
         return f"✅ File saved: {filepath}"
     except Exception as e:
         return f"Error saving file: {str(e)}"
+
+
+def run_step(step: dict, context: dict) -> str:
+    """Executor step handler: create a document from the step input or the previous result."""
+    try:
+        return create_docx.invoke({
+            "title": context.get("plan", {}).get("overall_goal", "Document"),
+            "content": step.get("input") or context.get("previous_result", "")
+        })
+    except Exception as e:
+        return f"Document creation error: {e}"
@@ -0,0 +1,212 @@
+"""
+tools/registry.py - Tool Registry
+Declarative list of the tools the executor can dispatch to.
+Each tool is imported lazily on first use and runs under its own
+concurrency limit and timeout; cacheable tools reuse recent results
+through the shared state backend.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass
+
+from config import SCHEDULER_ENABLED, TOOL_CACHE_TTL, TOOL_WORKERS
+from services.llm_limiter import set_deadline
+from services.state_backend import get_state_backend
+
+
+@dataclass
+class ToolSpec:
+    """Declaration of one executor tool."""
+    name: str                    # Name used in plan steps
+    description: str             # Shown to the planner
+    target: str                  # "module:function" step handler, imported on first use
+    input_hint: str = "string"   # What the step "input" should contain
+    is_async: bool = False       # Handler is a coroutine function
+    concurrency: int = 4         # Max simultaneous runs of this tool
+    timeout: float = 60.0        # Seconds before the step is abandoned
+    cacheable: bool = False      # Same input → same output, safe to reuse
+    error_prefixes: tuple = ()   # Results starting with these are errors, never cached
+    review_output: bool = False  # Output goes through the writer ↔ reviewer loop
+
+
+class ToolRegistry:
+    """
+    Maps tool names to ToolSpecs and runs their step handlers.
+    
+    A step handler has the signature handler(step: dict, context: dict) -> str,
+    where context holds the parsed plan, the previous step result and the
+    optional reply_sink.
+    """
+    
+    def __init__(self, max_workers: int = TOOL_WORKERS):
+        self._specs = {}
+        self._handlers = {}
+        self._semaphores = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+    
+    def register(self, spec: ToolSpec) -> None:
+        """Add (or replace) a tool."""
+        self._specs[spec.name] = spec
+        self._semaphores[spec.name] = threading.BoundedSemaphore(spec.concurrency)
+        self._handlers.pop(spec.name, None)
+    
+    def get(self, name: str) -> ToolSpec:
+        """Return the spec for a tool, or None if it is unknown."""
+        return self._specs.get(name)
+    
+    def names(self) -> list:
+        """Registered tool names, in registration order."""
+        return list(self._specs)
+    
+    def describe_for_prompt(self) -> str:
+        """Bullet list of tools for the planner prompt."""
+        return "\n".join(
+            f"- {spec.name}: {spec.description} (input: {spec.input_hint})"
+            for spec in self._specs.values()
+        )
+    
+    def resolve(self, name: str):
+        """Import and return the step handler for a tool (cached after first use)."""
+        handler = self._handlers.get(name)
+        if handler is None:
+            module_name, _, attribute = self._specs[name].target.partition(":")
+            handler = getattr(importlib.import_module(module_name), attribute)
+            self._handlers[name] = handler
+        return handler
+    
+    def is_error(self, name: str, result: str) -> bool:
+        """Whether a result is an error, from the tool itself or from invoke() (busy, timed out)."""
+        spec = self._specs.get(name)
+        if spec is None:
+            return True
+        return result.startswith(spec.error_prefixes + (f"The {name} tool is busy", f"The {name} tool timed out"))
+    
+    def invoke(self, name: str, step: dict, context: dict = None) -> str:
+        """
+        Run one plan step with the named tool.
+        
+        Args:
+            name: Tool name from the plan
+            step: The plan step ({"tool", "description", "input"})
+            context: Extra data for the handler (plan, previous_result, reply_sink)
+            
+        Returns:
+            The step's result text
+        """
+        spec = self._specs.get(name)
+        if spec is None:
+            return f"I am not sure which tool to use for: {name}"
+        
+        context = context or {}
+        cache_key = self._cache_key(name, step.get("input", ""))
+        if spec.cacheable:
+            cached = get_state_backend().get(cache_key)
+            if cached is not None:
+                print(f"--- ♻️ CACHED {name} RESULT ---")
+                return cached
+        
+        # Import before taking a permit, so an import error cannot leak it
+        handler = self.resolve(name)
+        deadline = time.monotonic() + spec.timeout
+        
+        def call():
+            # LLM calls made by the handler give up at the step deadline instead
+            # of starting after invoke() has already returned a timeout
+            set_deadline(deadline)
+            if spec.is_async:
+                return asyncio.run(handler(step, context))
+            return handler(step, context)
+        
+        semaphore = self._semaphores[name]
+        if not semaphore.acquire(timeout=spec.timeout):
+            return f"The {name} tool is busy right now, please try again."
+        
+        # Keep the caller's context (LangChain callbacks, config) in the worker
+        # thread; the permit is released when the handler really finishes.
+        try:
+            future = self._pool.submit(contextvars.copy_context().run, call)
+        except Exception:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: semaphore.release())
+        
+        try:
+            result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            return f"The {name} tool timed out after {spec.timeout:g}s."
+        
+        if spec.cacheable and not self.is_error(name, result):
+            get_state_backend().set(cache_key, result, ttl=TOOL_CACHE_TTL)
+        return result
+    
+    @staticmethod
+    def _cache_key(name: str, tool_input: str) -> str:
+        digest = hashlib.sha1(tool_input.encode("utf-8")).hexdigest()
+        return f"tool:{name}:{digest}"
+
+
+# =============================================================================
+# DEFAULT REGISTRY
+# =============================================================================
+
+registry = ToolRegistry()
+
+registry.register(ToolSpec(
+    name="writer",
+    description="writes or rewrites email text or short messages.",
+    target="agents.writer:run_step",
+    input_hint="the topic or source text to write from",
+    timeout=90,
+    review_output=True,
+))
+registry.register(ToolSpec(
+    name="calculator",
+    description="does math or numeric calculations.",
+    target="tools.calculator:run_step",
+    input_hint="a math expression such as 2 + 3 * 4",
+    concurrency=8,
+    timeout=5,
+    cacheable=True,
+    error_prefixes=("Calculator error",),
+))
+registry.register(ToolSpec(
+    name="email_sender",
+    description="sends or schedules emails using a ready email body." if SCHEDULER_ENABLED
+    else "sends emails using a ready email body.",
+    target="tools.email_sender:run_step",
+    input_hint='the full email body, optionally after "To:", "Subject:" and "Send at:" lines' if SCHEDULER_ENABLED
+    else 'the full email body, optionally after "To:" and "Subject:" lines',
+    timeout=30,
+))
+# Reminders only fire while a scheduler dispatcher is running
+if SCHEDULER_ENABLED:
+    registry.register(ToolSpec(
+        name="reminder",
+        description="reminds the user on WhatsApp at a later time.",
+        target="tools.reminder:run_step",
+        input_hint='when and what, e.g. "in 2 hours: call the bank" or "2026-01-05 09:00 Europe/Paris: pay rent"',
+        timeout=10,
+    ))
+registry.register(ToolSpec(
+    name="search",
+    description="searches the web for current information.",
+    target="tools.search:run_step",
+    input_hint="a web search query",
+    timeout=20,
+    cacheable=True,
+    error_prefixes=("Search error", "Web search requires", "Web search is not available"),
+))
+registry.register(ToolSpec(
+    name="create_document",
+    description="creates a Word document with content.",
+    target="tools.file_ops:run_step",
+    input_hint="the document text, or empty to use the previous step's result",
+    concurrency=1,
+    timeout=30,
+))
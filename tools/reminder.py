@@ -0,0 +1,140 @@
+"""
+tools/reminder.py - Reminder Tool
+Schedules a WhatsApp message to the user at a later time.
+Times are read in the zone named after them ("7pm Europe/Paris", "9:00 UTC"),
+or else in USER_TIMEZONE.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from langchain_core.tools import tool
+
+from config import SCHEDULER_ENABLED, USER_TIMEZONE
+from services.scheduler import get_scheduler
+
+
+UNITS = {
+    "second": 1, "sec": 1, "minute": 60, "min": 60,
+    "hour": 3600, "hr": 3600, "day": 86400, "week": 604800,
+}
+
+RELATIVE = re.compile(r"^\s*in\s+(\d+(?:\.\d+)?)\s*(second|sec|minute|min|hour|hr|day|week)s?\b", re.I)
+DATE_TIME = re.compile(r"^\s*(?:on\s+)?(\d{4}-\d{2}-\d{2})(?:[ T](?:at\s+)?(\d{1,2}:\d{2}))?", re.I)
+CLOCK = re.compile(r"^\s*(tomorrow\s+)?(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b", re.I)
+TOMORROW = re.compile(r"^\s*tomorrow\b", re.I)
+ZONE = re.compile(r"^\s*((?i:UTC|GMT)|[A-Za-z]+(?:/[A-Za-z0-9_+-]+)+)(?![\w/])")
+
+
+def get_zone(name: str):
+    """ZoneInfo for an IANA name ("UTC" and "GMT" included), or None if unknown."""
+    if name.upper() in ("UTC", "GMT"):
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _zone(rest: str, default) -> tuple:
+    """Take an explicit zone off the front of `rest`; returns (zone, remaining text)."""
+    match = ZONE.match(rest)
+    zone = get_zone(match.group(1)) if match else None
+    if zone is None:
+        return default, rest
+    return zone, rest[match.end():]
+
+
+def parse_when(text: str, now: datetime = None, default_zone: str = USER_TIMEZONE) -> tuple:
+    """
+    Split "<when> <message>" into a due datetime and the message.
+
+    Understands "in 10 minutes ...", "2026-01-05 09:00 ...", "at 18:30 ...",
+    "7pm ...", "tomorrow at 9 ..." and "tomorrow ..." (9am). A zone may follow
+    the time ("7pm Europe/Paris ..."); otherwise `default_zone` is used.
+
+    Returns:
+        (timezone-aware datetime, message), or (None, text) if no time was found
+    """
+    default = get_zone(default_zone) or timezone.utc
+    now = now or datetime.now(timezone.utc)
+
+    match = RELATIVE.match(text)
+    if match:
+        due = (now + timedelta(seconds=float(match.group(1)) * UNITS[match.group(2).lower()])).astimezone(default)
+        return due, _message(text[match.end():])
+
+    match = DATE_TIME.match(text)
+    if match:
+        try:
+            due = datetime.fromisoformat(f"{match.group(1)} {match.group(2) or '09:00'}")
+        except ValueError:  # e.g. month 13 or 25:00
+            return None, text
+        zone, rest = _zone(text[match.end():], default)
+        return due.replace(tzinfo=zone), _message(rest)
+
+    match = CLOCK.match(text)
+    if match and (match.group(3) or match.group(4) or match.group(1) or text.lstrip().lower().startswith("at")):
+        hour, minute = int(match.group(2)), int(match.group(3) or 0)
+        if match.group(4):
+            hour = hour % 12 + (12 if match.group(4).lower() == "pm" else 0)
+        if hour < 24 and minute < 60:
+            zone, rest = _zone(text[match.end():], default)
+            local_now = now.astimezone(zone)
+            due = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if match.group(1) or due <= local_now:
+                due += timedelta(days=1)
+            return due, _message(rest)
+
+    match = TOMORROW.match(text)
+    if match:
+        local_now = now.astimezone(default)
+        due = (local_now + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+        return due, _message(text[match.end():])
+
+    return None, text
+
+
+def _message(rest: str) -> str:
+    """Strip separators left between the time and the message."""
+    return re.sub(r"^[\s:,\-–]+(?:to\s+)?", "", rest).strip()
+
+
+@tool
+def set_reminder(when_and_message: str, recipient: str) -> str:
+    """
+    Schedule a WhatsApp reminder.
+
+    Args:
+        when_and_message: When and what, e.g. "in 2 hours: call the bank"
+        recipient: WhatsApp address to remind (e.g., whatsapp:+1234567890)
+
+    Returns:
+        Confirmation or an explanation of what was missing
+    """
+    if not SCHEDULER_ENABLED:
+        return "Reminders are not available right now (the scheduler is turned off)."
+    if not recipient:
+        return "I can only set reminders from a WhatsApp conversation."
+
+    due, message = parse_when(when_and_message)
+    if due is None:
+        return "I could not tell when to remind you. Try e.g. 'in 30 minutes: call mom'."
+    if due <= datetime.now(timezone.utc):
+        return f"{due:%Y-%m-%d %H:%M %Z} is already in the past."
+
+    get_scheduler().schedule(
+        "whatsapp",
+        {"to": recipient, "body": f"⏰ Reminder: {message or 'you asked me to remind you now.'}"},
+        due.timestamp(),
+    )
+    return f"⏰ Reminder set for {due:%Y-%m-%d %H:%M %Z}: {message}"
+
+
+def run_step(step: dict, context: dict) -> str:
+    """Executor step handler: remind the sender of the current message."""
+    return set_reminder.invoke({
+        "when_and_message": step.get("input", ""),
+        "recipient": context.get("recipient", ""),
+    })
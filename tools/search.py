@@ -6,6 +6,9 @@ Uses Tavily API for web search capabilities.
 import os
 from langchain_core.tools import tool
 
+from config import TAVILY_API_BASE
+from services.cassette import cassette, CassetteMiss
+
 # Check if Tavily is available
 try:
     from tavily import TavilyClient
@@ -30,12 +33,14 @@ def web_search(query: str, max_results: int = 5) -> str:
         return "Web search is not available. Please install tavily-python: pip install tavily-python"
     
     api_key = os.getenv("TAVILY_API_KEY", "")
-    if not api_key:
+    if not api_key and not cassette.replaying:
         return "Web search requires a TAVILY_API_KEY. Get one free at https://tavily.com"
     
     try:
-        client = TavilyClient(api_key=api_key)
-        response = client.search(query, max_results=max_results)
+        response = cassette.call(
+            "tool", "search", {"query": query, "max_results": max_results},
+            lambda: TavilyClient(api_key=api_key, api_base_url=TAVILY_API_BASE).search(query, max_results=max_results)
+        )
         
         results = []
         for i, result in enumerate(response.get("results", []), 1):
@@ -49,5 +54,17 @@ def web_search(query: str, max_results: int = 5) -> str:
         else:
             return "No results found for your query."
             
+    except CassetteMiss:
+        raise  # Replay runs must report calls that were not recorded
     except Exception as e:
         return f"Search error: {str(e)}"
+
+
+def run_step(step: dict, context: dict) -> str:
+    """Executor step handler: search the web for the step input."""
+    try:
+        return web_search.invoke({"query": step.get("input", "")})
+    except CassetteMiss:
+        raise
+    except Exception as e:
+        return f"Search error: {e}"
@@ -0,0 +1,153 @@
+"""
+worker.py - Workflow Worker Process
+Pulls WhatsApp jobs queued by the web tier (JOB_QUEUE_ENABLED=true), runs the
+agent workflow and sends the reply through the Twilio REST API.
+
+Usage (from project root, with venv activated):
+    python worker.py                   # run forever
+    python worker.py --concurrency 8   # jobs processed at the same time
+    python worker.py --drain           # exit once the queue is empty
+
+Start several processes to scale the LLM pipeline independently of the web tier.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import time
+
+from config import (
+    RUN_LEASE_TTL,
+    STREAMING_REPLIES,
+    SCHEDULER_ENABLED,
+    WORKER_CONCURRENCY,
+    WORKER_POLL_INTERVAL,
+    JOB_RETRY_DELAY,
+)
+from services.job_queue import JobQueue
+from services.scheduler import get_scheduler
+from services.streaming import StreamingDelivery
+from services.whatsapp import WhatsAppSender
+from workflows.research_flow import refresh_run_lease, run_workflow
+
+
+def process_job(job: dict, sender: WhatsAppSender) -> None:
+    """
+    Run the workflow for one job and deliver the reply (blocking).
+    Raises if the workflow fails, another process is still running the thread
+    (RunInProgress) or any part of the reply could not be sent, so the job is
+    retried (resuming from its checkpoints) or dead-lettered.
+    """
+    payload = job["payload"]
+    delivery = StreamingDelivery(sender.send, payload["to"])
+
+    try:
+        response = run_workflow(
+            payload["body"],
+            thread_id=payload.get("thread_id"),
+            reply_sink=delivery.feed if STREAMING_REPLIES else None,
+            recipient=payload["to"]
+        )
+    except Exception:
+        delivery.abort()
+        raise
+    metrics = delivery.finish(response)
+    if metrics["error"]:
+        raise RuntimeError(f"Reply not delivered: {metrics['error']}")
+
+
+class Worker:
+    """Runs up to `concurrency` jobs at once on one asyncio loop."""
+
+    def __init__(self, queue: JobQueue, sender: WhatsAppSender, concurrency: int, drain: bool = False):
+        self.queue = queue
+        self.sender = sender
+        self.concurrency = concurrency
+        self.drain = drain
+        self.stopping = False
+        self.done = 0
+        self.failed = 0
+        self.started_at = time.perf_counter()
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._slot(i) for i in range(self.concurrency)))
+
+        elapsed = time.perf_counter() - self.started_at
+        rate = self.done / elapsed if elapsed else 0.0
+        print(f"📊 Worker {os.getpid()}: {self.done} jobs done, {self.failed} failed "
+              f"in {elapsed:.1f}s ({rate:.2f} jobs/s)")
+
+    async def _slot(self, index: int) -> None:
+        while not self.stopping:
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                if self.drain:
+                    return
+                await asyncio.sleep(WORKER_POLL_INTERVAL)
+                continue
+            await self._handle(job)
+
+    async def _handle(self, job: dict) -> None:
+        print(f"--- 📥 JOB {job['id']} (attempt {job['attempt']}) ---")
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await asyncio.to_thread(process_job, job, self.sender)
+        except Exception as e:
+            outcome = await asyncio.to_thread(self.queue.fail, job, str(e), JOB_RETRY_DELAY)
+            self.failed += 1
+            print(f"⚠️  Job {job['id']} failed ({outcome}): {e}")
+            if outcome == "dead":
+                await asyncio.to_thread(self._apologize, job)
+        else:
+            await asyncio.to_thread(self.queue.ack, job)
+            self.done += 1
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: dict) -> None:
+        """Keep extending the claim and the thread's run lease while a long workflow is running."""
+        thread_id = job["payload"].get("thread_id")
+        while True:
+            await asyncio.sleep(min(self.queue.visibility_timeout, RUN_LEASE_TTL) / 2)
+            await asyncio.to_thread(self.queue.extend, job)
+            if thread_id:
+                await asyncio.to_thread(refresh_run_lease, thread_id)
+
+    def _apologize(self, job: dict) -> None:
+        try:
+            self.sender.send(job["payload"]["to"], "Sorry, I encountered an error handling your message.")
+        except Exception as e:
+            print(f"⚠️  Could not notify {job['payload']['to']}: {e}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Process queued WhatsApp workflow jobs.")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help="jobs processed at the same time")
+    parser.add_argument("--drain", action="store_true",
+                        help="exit once the queue has no due jobs")
+    args = parser.parse_args()
+
+    sender = WhatsAppSender()
+    if not sender.enabled:
+        print("⚠️  Twilio credentials missing: replies cannot be sent")
+
+    if SCHEDULER_ENABLED and not args.drain:
+        get_scheduler().start()
+
+    worker = Worker(JobQueue(), sender, args.concurrency, drain=args.drain)
+    print(f"🚀 Worker {os.getpid()} started (concurrency {args.concurrency})")
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # Finish the jobs in hand, then exit
+            loop.add_signal_handler(sig, lambda: setattr(worker, "stopping", True))
+        await worker.run()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,6 @@ workflows/__init__.py - Workflows Package
 Exports workflow graphs for easy importing.
 """
 
-from workflows.research_flow import create_workflow, run_workflow, app_graph
+from workflows.research_flow import create_workflow, run_workflow, app_graph, RunInProgress
 
-__all__ = ["create_workflow", "run_workflow", "app_graph"]
+__all__ = ["create_workflow", "run_workflow", "app_graph", "RunInProgress"]
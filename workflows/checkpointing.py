@@ -0,0 +1,215 @@
+"""
+workflows/checkpointing.py - Durable Workflow Checkpoints
+Persists LangGraph state per request/thread id so a retried request resumes
+from the last completed step instead of re-running the whole pipeline.
+
+Large step outputs (search dumps, drafts, replies) are stored once as
+artifacts next to the checkpoints; the graph state only carries their ids,
+so each checkpoint doesn't re-serialize the same text.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    CHECKPOINT_DB_PATH,
+    CHECKPOINT_RETENTION_HOURS,
+    CHECKPOINT_COMPACT_INTERVAL,
+)
+
+# Check if the SQLite checkpointer is available
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    SQLITE_CHECKPOINTS_AVAILABLE = True
+except ImportError:
+    from langgraph.checkpoint.memory import MemorySaver
+    SQLITE_CHECKPOINTS_AVAILABLE = False
+
+
+class CheckpointStore:
+    """
+    Owns the LangGraph checkpointer plus a small bookkeeping table used for
+    retention and compaction of old threads.
+    """
+
+    # Without SQLite: finished threads kept in memory (enough to answer retries)
+    MEMORY_FINISHED_THREADS = 1000
+
+    def __init__(self, db_path: str = CHECKPOINT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._last_compaction = 0.0
+        # Used when there is no SQLite database: thread id -> {ref: content},
+        # and finished thread ids, oldest first. Only finished threads are evicted.
+        self._artifacts = {}
+        self._finished = OrderedDict()
+
+        if SQLITE_CHECKPOINTS_AVAILABLE:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.saver = SqliteSaver(self.conn)
+            self.saver.setup()
+            with self.saver.cursor() as cur:
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS checkpoint_threads (
+                        thread_id TEXT PRIMARY KEY,
+                        updated_at REAL NOT NULL,
+                        completed INTEGER NOT NULL DEFAULT 0
+                    )
+                    """
+                )
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS checkpoint_artifacts (
+                        thread_id TEXT NOT NULL,
+                        ref TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        PRIMARY KEY (thread_id, ref)
+                    )
+                    """
+                )
+        else:
+            print("⚠️  langgraph-checkpoint-sqlite not installed, checkpoints are in-memory only")
+            self.conn = None
+            self.saver = MemorySaver()
+
+    def touch(self, thread_id: str, completed: bool = False) -> None:
+        """Record activity on a thread so retention knows when it was last used."""
+        if self.conn is None:
+            self._touch_memory(thread_id, completed)
+            return
+        with self.saver.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO checkpoint_threads (thread_id, updated_at, completed)
+                VALUES (?, ?, ?)
+                ON CONFLICT(thread_id) DO UPDATE SET
+                    updated_at = excluded.updated_at,
+                    completed = excluded.completed
+                """,
+                (thread_id, time.time(), int(completed)),
+            )
+
+    def put_artifact(self, thread_id: str, content: str) -> str:
+        """
+        Store a step output and return its id.
+        Ids are content hashes, so identical text is stored once per thread.
+        """
+        ref = hashlib.sha1(content.encode("utf-8")).hexdigest()[:20]
+        if self.conn is None:
+            with self._lock:
+                self._artifacts.setdefault(thread_id, {})[ref] = content
+            return ref
+
+        with self.saver.cursor() as cur:
+            cur.execute(
+                "INSERT OR IGNORE INTO checkpoint_artifacts (thread_id, ref, content) VALUES (?, ?, ?)",
+                (thread_id, ref, content),
+            )
+        return ref
+
+    def get_artifact(self, thread_id: str, ref: str) -> str:
+        """Return an artifact's text ("" for an empty or unknown id)."""
+        if not ref:
+            return ""
+        if self.conn is None:
+            with self._lock:
+                return self._artifacts.get(thread_id, {}).get(ref, "")
+
+        with self.saver.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT content FROM checkpoint_artifacts WHERE thread_id = ? AND ref = ?",
+                (thread_id, ref),
+            )
+            row = cur.fetchone()
+        return row[0] if row else ""
+
+    def _touch_memory(self, thread_id: str, completed: bool) -> None:
+        """
+        In-memory bookkeeping: a running thread keeps all its artifacts; past
+        MEMORY_FINISHED_THREADS the oldest finished threads are dropped whole
+        (checkpoints too, so a late retry starts over instead of finding a
+        reply id without its text).
+        """
+        with self._lock:
+            if not completed:
+                self._finished.pop(thread_id, None)
+                return
+            self._finished[thread_id] = None
+            self._finished.move_to_end(thread_id)
+            evicted = []
+            while len(self._finished) > self.MEMORY_FINISHED_THREADS:
+                old, _ = self._finished.popitem(last=False)
+                self._artifacts.pop(old, None)
+                evicted.append(old)
+        for old in evicted:
+            self.saver.delete_thread(old)
+
+    def compact(self, retention_hours: float = CHECKPOINT_RETENTION_HOURS) -> dict:
+        """
+        Apply the retention policy and compact what is left.
+
+        - Threads idle for longer than the retention window are deleted.
+        - Completed threads keep only their latest checkpoint (enough to answer
+          a duplicate retry) and drop their pending writes.
+
+        Returns:
+            Dict with the number of deleted threads and checkpoints
+        """
+        if self.conn is None:
+            return {"expired_threads": 0, "compacted_checkpoints": 0}
+
+        cutoff = time.time() - retention_hours * 3600
+        with self.saver.cursor() as cur:
+            cur.execute(
+                "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?",
+                (cutoff,),
+            )
+            expired = [row[0] for row in cur.fetchall()]
+            for thread_id in expired:
+                cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                cur.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+                cur.execute("DELETE FROM checkpoint_artifacts WHERE thread_id = ?", (thread_id,))
+                cur.execute("DELETE FROM checkpoint_threads WHERE thread_id = ?", (thread_id,))
+
+            # Checkpoint ids are time-ordered, so MAX() is the latest one
+            cur.execute(
+                """
+                DELETE FROM checkpoints
+                WHERE thread_id IN (SELECT thread_id FROM checkpoint_threads WHERE completed = 1)
+                  AND checkpoint_id < (
+                      SELECT MAX(c2.checkpoint_id) FROM checkpoints c2
+                      WHERE c2.thread_id = checkpoints.thread_id
+                        AND c2.checkpoint_ns = checkpoints.checkpoint_ns
+                  )
+                """
+            )
+            compacted = cur.rowcount
+            cur.execute(
+                """
+                DELETE FROM writes
+                WHERE thread_id IN (SELECT thread_id FROM checkpoint_threads WHERE completed = 1)
+                """
+            )
+
+        with self.saver.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"expired_threads": len(expired), "compacted_checkpoints": compacted}
+
+    def maybe_compact(self) -> None:
+        """Run compaction at most once per CHECKPOINT_COMPACT_INTERVAL seconds."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_compaction < CHECKPOINT_COMPACT_INTERVAL:
+                return
+            self._last_compaction = now
+
+        try:
+            stats = self.compact()
+            if stats["expired_threads"] or stats["compacted_checkpoints"]:
+                print(f"🧹 Checkpoint compaction: {stats}")
+        except sqlite3.Error as e:
+            print(f"⚠️  Checkpoint compaction failed: {e}")
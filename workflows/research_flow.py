@@ -1,20 +1,31 @@
 """
 workflows/research_flow.py - Main Workflow
-LangGraph workflow that uses planner → executor pattern from original code.
+LangGraph workflow that uses planner → executor pattern from original code,
+with a bounded writer ↔ reviewer revision loop for drafts.
+
+Step outputs are stored once as checkpoint artifacts and the state carries
+only their ids (*_ref), so checkpoints stay small and the same text isn't
+copied into several state fields.
 """
 
 import json
+import time
+import uuid
 from typing import TypedDict
 
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
 from agents.planner import PlannerAgent
 from agents.writer import WriterAgent
-from agents.reviewer import ReviewerAgent
-from tools.calculator import calculator
-from tools.search import web_search
-from tools.email_sender import email_sender
-from tools.file_ops import create_docx
+from agents.reviewer import ReviewerAgent, local_precheck
+from config import REVIEW_MAX_REVISIONS, REVIEW_BUDGET_SECONDS, RUN_LEASE_TTL
+from services.cassette import CassetteMiss
+from services.memory import memory_tracker
+from services.state_backend import get_state_backend
+from tools.registry import registry
+from workflows.checkpointing import CheckpointStore
+from workflows.speculation import speculator
 
 
 # =============================================================================
@@ -25,21 +36,47 @@ class AgentState(TypedDict):
     """State that flows through the workflow (matches original code)."""
     user_message: str       # What the person typed on WhatsApp
     plan_json: str          # Planner's JSON text
-    last_tool_result: str   # Result from the last tool execution
-    final_reply: str        # Final response to send back
+    step_index: int         # Index of the next plan step to execute
+    step_count: int         # Number of steps in the plan
+    result_ref: str         # Artifact id of the last step result (the reply once finished)
+    search_ref: str         # Artifact id of the latest search results
+    draft_ref: str          # Artifact id of the writer draft waiting for review
+    review_pending: bool    # True while the draft is in the review loop
+    review_decision: str    # Latest reviewer decision
+    review_reason: str      # Why the reviewer decided that
+    revision_count: int     # Rewrite/re-search rounds done for this draft
+    revision_deadline: float  # Time after which the draft is accepted as-is
+
+
+# =============================================================================
+# STEP ARTIFACTS
+# =============================================================================
+
+def _store(config: RunnableConfig, text: str) -> str:
+    """Save a step output for this thread and return its artifact id."""
+    return checkpoints.put_artifact(config["configurable"]["thread_id"], text)
+
+
+def _load(config: RunnableConfig, ref: str) -> str:
+    """Return the text of an artifact id ("" if unset)."""
+    return checkpoints.get_artifact(config["configurable"]["thread_id"], ref)
 
 
 # =============================================================================
 # PLANNER NODE
 # =============================================================================
 
-def planner_node(state: AgentState) -> dict:
+def planner_node(state: AgentState, config: RunnableConfig) -> dict:
     """
     Node 1: Look at the user_message and create a JSON plan.
     Uses the PlannerAgent to decide which tools to use.
+    
+    With SPECULATION_ENABLED the likely first tool calls start in the
+    background while the planner runs.
     """
     print("--- 🧠 PLANNING ---")
     
+    speculator.start(config["configurable"]["thread_id"], state["user_message"])
     planner = PlannerAgent()
     plan_text = planner.create_plan(state["user_message"])
     
@@ -50,13 +87,41 @@ def planner_node(state: AgentState) -> dict:
 # EXECUTOR NODE
 # =============================================================================
 
-def executor_node(state: AgentState) -> dict:
+def execute_step(step: dict, plan: dict, previous_result: str, reply_sink=None,
+                 recipient: str = "") -> str:
     """
-    Node 2: Read plan_json and execute the steps.
-    This matches the original executor logic from the user's code.
+    Run a single plan step through the tool registry and return its text result.
+    
+    Args:
+        step: The plan step ({"tool", "description", "input"})
+        plan: The whole parsed plan (used for the document title)
+        previous_result: Result of the step before this one
+        reply_sink: Optional callable fed with writer tokens as they stream
+        recipient: WhatsApp address of the user (for reminders), if known
+        
+    Returns:
+        The step's result text
     """
-    print("--- 🛠️ EXECUTING PLAN ---")
+    context = {
+        "plan": plan,
+        "previous_result": previous_result,
+        "reply_sink": reply_sink,
+        "recipient": recipient,
+    }
+    return registry.invoke(step.get("tool"), step, context)
+
+
+def executor_node(state: AgentState, config: RunnableConfig) -> dict:
+    """
+    Node 2: Read plan_json and execute the next step of the plan.
+    
+    Only one step runs per visit so that every finished step is checkpointed;
+    the graph loops back here until all steps are done.
     
+    When a reply_sink is configured and the last step is the writer, its
+    tokens are streamed straight to the user. A streamed draft has already
+    been delivered, so it skips the review loop.
+    """
     plan_text = state.get("plan_json", "{}")
     
     # Parse the plan
@@ -64,116 +129,256 @@ def executor_node(state: AgentState) -> dict:
         plan = json.loads(plan_text)
     except json.JSONDecodeError:
         reply = "Sorry, I could not understand the plan."
-        return {"last_tool_result": reply, "final_reply": reply}
+        return {"step_count": 0, "result_ref": _store(config, reply)}
     
     steps = plan.get("steps", [])
     if not steps:
         reply = "I could not find any actions to take for your request."
-        return {"last_tool_result": reply, "final_reply": reply}
+        return {"step_count": 0, "result_ref": _store(config, reply)}
     
-    # Initialize agents
-    writer = WriterAgent()
-    reviewer = ReviewerAgent()
+    index = state.get("step_index", 0)
+    step = steps[index]
+    print(f"--- 🛠️ EXECUTING STEP {index + 1}/{len(steps)} ---")
     
-    # Execute each step
-    result_text = ""
+    # Drafts are reviewed by the review loop; a "reviewer" step left in a plan
+    # (e.g. one checkpointed before the tool was removed) keeps the draft as the result
+    if step.get("tool") == "reviewer":
+        return {"step_index": index + 1, "step_count": len(steps)}
     
-    for step in steps:
-        tool_name = step.get("tool")
-        tool_input = step.get("input", "")
-        
-        if tool_name == "calculator":
-            try:
-                result = calculator.invoke({"expression": tool_input})
-                result_text = f"The result of your calculation is: {result}"
-            except Exception as e:
-                result_text = f"Calculator error: {e}"
-        
-        elif tool_name == "writer":
-            # Use the WriterAgent
-            result_text = writer.write(
-                task=step.get("description", "write"),
-                content=tool_input,
-                instructions=""
-            )
-        
-        elif tool_name == "reviewer":
-            # Use the ReviewerAgent
-            review = reviewer.review(topic="User request", draft=tool_input)
-            result_text = f"Review decision: {review['decision']}.\nReason: {review['reason']}"
-        
-        elif tool_name == "email_sender":
-            # Use email sender tool
-            result_text = email_sender.invoke({"email_body": tool_input})
-        
-        elif tool_name == "search":
-            try:
-                result_text = web_search.invoke({"query": tool_input})
-            except Exception as e:
-                result_text = f"Search error: {e}"
-        
-        elif tool_name == "create_document":
-            try:
-                doc_result = create_docx.invoke({
-                    "title": plan.get("overall_goal", "Document"),
-                    "content": tool_input if tool_input else result_text
-                })
-                result_text = doc_result
-            except Exception as e:
-                result_text = f"Document creation error: {e}"
-        
-        else:
-            result_text = f"I am not sure which tool to use for: {tool_name}"
+    reply_sink = config.get("configurable", {}).get("reply_sink")
+    if index < len(steps) - 1:
+        reply_sink = None
+    
+    thread_id = config["configurable"]["thread_id"]
+    if index == 0:
+        speculator.keep_matching(thread_id, steps)
+    
+    result_text = speculator.claim(thread_id, step)
+    if result_text is None:
+        previous_result = _load(config, state.get("result_ref", ""))
+        recipient = config["configurable"].get("recipient", "")
+        result_text = execute_step(step, plan, previous_result, reply_sink, recipient)
+    result_ref = _store(config, result_text)
+    update = {"step_index": index + 1, "step_count": len(steps)}
+    
+    # Writer drafts go through the review loop before becoming the result
+    spec = registry.get(step.get("tool"))
+    if spec and spec.review_output and not reply_sink:
+        update.update({
+            "draft_ref": result_ref,
+            "review_pending": True,
+            "revision_count": 0,
+            "revision_deadline": time.time() + REVIEW_BUDGET_SECONDS,
+        })
+        return update
+    
+    if step.get("tool") == "search":
+        update["search_ref"] = result_ref
+    
+    update["result_ref"] = result_ref
+    return update
+
+
+def route_after_executor(state: AgentState) -> str:
+    """Send drafts to review, otherwise loop back while plan steps remain."""
+    if state.get("review_pending"):
+        return "reviewer"
+    if state.get("step_index", 0) < state.get("step_count", 0):
+        return "executor"
+    return END
+
+
+# =============================================================================
+# REVIEW LOOP NODES
+# =============================================================================
+
+def _current_step(state: AgentState) -> dict:
+    """Return the plan step that produced the draft under review."""
+    plan = json.loads(state.get("plan_json", "{}"))
+    return plan.get("steps", [])[state.get("step_index", 1) - 1]
+
+
+def reviewer_node(state: AgentState, config: RunnableConfig) -> dict:
+    """
+    Decide whether the current draft is good enough.
+    
+    Local heuristics run first; only drafts that fail them reach the reviewer
+    LLM. Once the iteration or time budget is spent the draft is accepted.
+    """
+    draft = _load(config, state.get("draft_ref", ""))
+    passed, problems = local_precheck(draft, _load(config, state.get("search_ref", "")))
+    
+    if passed:
+        print("--- ✅ REVIEW: LOCAL CHECKS PASSED ---")
+        decision, reason = "APPROVE", "Passed local checks."
+    elif (state.get("revision_count", 0) >= REVIEW_MAX_REVISIONS
+          or time.time() >= state.get("revision_deadline", 0)):
+        print("--- ⏱️ REVIEW: BUDGET SPENT, ACCEPTING DRAFT ---")
+        decision, reason = "APPROVE", "Revision budget spent."
+    else:
+        print(f"--- 🔍 REVIEWING DRAFT ({'; '.join(problems)}) ---")
+        try:
+            review = ReviewerAgent().review(topic=state["user_message"], draft=draft)
+            decision, reason = review["decision"], review["reason"]
+        except CassetteMiss:
+            raise  # An unrecorded call in a replay is a regression, not an outage
+        except Exception as e:
+            decision, reason = "APPROVE", f"Reviewer unavailable: {e}"
+    
+    update = {"review_decision": decision, "review_reason": reason}
+    if decision == "APPROVE":
+        update.update({"review_pending": False, "result_ref": state.get("draft_ref", "")})
+    return update
+
+
+def rewrite_node(state: AgentState, config: RunnableConfig) -> dict:
+    """REVISE_WRITER: rewrite the draft using the reviewer's feedback."""
+    print("--- ✍️ REWRITING DRAFT ---")
+    
+    draft = WriterAgent().rewrite(
+        original=_load(config, state.get("draft_ref", "")),
+        feedback=state.get("review_reason", "")
+    )
+    return {"draft_ref": _store(config, draft), "revision_count": state.get("revision_count", 0) + 1}
+
+
+def research_node(state: AgentState, config: RunnableConfig) -> dict:
+    """REVISE_SEARCHER: search for more facts and write the draft again."""
+    print("--- 🔎 RE-SEARCHING FOR DRAFT ---")
+    
+    facts = registry.invoke("search", {"input": state["user_message"]})
     
-    return {"last_tool_result": result_text, "final_reply": result_text}
+    step = _current_step(state)
+    draft = WriterAgent().write(
+        task=step.get("description", "write"),
+        content=step.get("input", ""),
+        instructions=f"Use these facts where relevant:\n{facts}"
+    )
+    return {
+        "draft_ref": _store(config, draft),
+        "search_ref": _store(config, facts),
+        "revision_count": state.get("revision_count", 0) + 1,
+    }
+
+
+def route_after_review(state: AgentState) -> str:
+    """Follow the reviewer decision, or continue the plan once approved."""
+    decision = state.get("review_decision")
+    if decision == "REVISE_WRITER":
+        return "rewrite"
+    if decision == "REVISE_SEARCHER":
+        return "research"
+    return route_after_executor(state)
 
 
 # =============================================================================
 # BUILD WORKFLOW
 # =============================================================================
 
-def create_workflow():
-    """Create and compile the workflow graph."""
+def create_workflow(checkpointer=None):
+    """
+    Create and compile the workflow graph.
+    
+    Args:
+        checkpointer: Optional LangGraph checkpointer for durable state
+    """
     workflow = StateGraph(AgentState)
     
     # Add nodes
     workflow.add_node("planner", planner_node)
     workflow.add_node("executor", executor_node)
+    workflow.add_node("reviewer", reviewer_node)
+    workflow.add_node("rewrite", rewrite_node)
+    workflow.add_node("research", research_node)
     
-    # Define flow: planner → executor → END
+    # Define flow: planner → executor (once per step) → END
+    # Writer drafts cycle: reviewer → (rewrite | research) → reviewer
     workflow.set_entry_point("planner")
     workflow.add_edge("planner", "executor")
-    workflow.add_edge("executor", END)
+    workflow.add_conditional_edges(
+        "executor", route_after_executor, ["executor", "reviewer", END]
+    )
+    workflow.add_conditional_edges(
+        "reviewer", route_after_review, ["rewrite", "research", "executor", END]
+    )
+    workflow.add_edge("rewrite", "reviewer")
+    workflow.add_edge("research", "reviewer")
     
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
 
+class RunInProgress(RuntimeError):
+    """Another call is already running this thread."""
 
-def run_workflow(user_message: str) -> str:
+
+def refresh_run_lease(thread_id: str) -> None:
+    """Extend the lease of a thread that is still running (called from the worker heartbeat)."""
+    backend = get_state_backend()
+    if backend.get(f"run:{thread_id}") is not None:
+        backend.set(f"run:{thread_id}", "1", ttl=RUN_LEASE_TTL)
+
+
+def run_workflow(user_message: str, thread_id: str = None, reply_sink=None,
+                 recipient: str = "") -> str:
     """
     Run the workflow with a user message.
     
+    If the thread already has checkpoints (e.g. a retried webhook), the run
+    resumes after the last completed step, or returns the stored reply when
+    the thread already finished. Only one run of a thread executes at a time;
+    a second call while it runs raises RunInProgress.
+    
     Args:
         user_message: The user's request
+        thread_id: Request/thread id used to key checkpoints (random if omitted)
+        reply_sink: Optional callable fed with reply tokens as they are generated
+        recipient: WhatsApp address of the sender (lets tools message them later)
         
     Returns:
         The final reply string
+        
+    Raises:
+        RunInProgress: The thread is already running elsewhere
     """
-    graph = create_workflow()
-    
-    # Stream through the graph
-    last_state = None
-    for s in graph.stream({"user_message": user_message}):
-        last_state = s
+    thread_id = thread_id or uuid.uuid4().hex
+    config = {"configurable": {"thread_id": thread_id, "reply_sink": reply_sink, "recipient": recipient}}
     
-    if last_state:
-        last_node_name = list(last_state.keys())[0]
-        return last_state[last_node_name].get(
-            "final_reply", "Sorry, I could not create a reply."
-        )
+    # A retried webhook must not execute the same steps alongside the first run
+    lease = f"run:{thread_id}"
+    if not get_state_backend().add(lease, "1", ttl=RUN_LEASE_TTL):
+        print(f"--- ⏳ {thread_id} IS ALREADY RUNNING ---")
+        raise RunInProgress(f"Thread {thread_id} is already running")
     
-    return "No response generated."
+    try:
+        with memory_tracker.track(thread_id):
+            snapshot = app_graph.get_state(config)
+            try:
+                if snapshot.next:
+                    print(f"--- ♻️ RESUMING {thread_id} AT {', '.join(snapshot.next)} ---")
+                    checkpoints.touch(thread_id)
+                    final_state = app_graph.invoke(None, config)
+                elif snapshot.values.get("result_ref"):
+                    print(f"--- ♻️ {thread_id} ALREADY COMPLETED ---")
+                    final_state = snapshot.values
+                else:
+                    checkpoints.touch(thread_id)
+                    final_state = app_graph.invoke({"user_message": user_message}, config)
+            finally:
+                speculator.finish(thread_id)
+            
+            checkpoints.touch(thread_id, completed=True)
+            checkpoints.maybe_compact()
+            
+            if not final_state:
+                return "No response generated."
+            
+            reply = _load(config, final_state.get("result_ref", ""))
+            return reply or "Sorry, I could not create a reply."
+    finally:
+        get_state_backend().delete(lease)
 
 
 # Create a compiled graph instance for import
-app_graph = create_workflow()
+checkpoints = CheckpointStore()
+app_graph = create_workflow(checkpointer=checkpoints.saver)
 print("✅ WhatsApp AI assistant LangGraph compiled!")
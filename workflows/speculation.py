@@ -0,0 +1,187 @@
+"""
+workflows/speculation.py - Speculative Tool Prefetch
+While the planner is thinking, runs the tool calls most plans start with
+(a web search on the user's own words, a calculation if the message holds
+an expression). The executor reuses a result when a plan step matches it;
+speculations no plan step asks for are cancelled or discarded.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import SPECULATION_ENABLED, SPECULATION_WORKERS, SPECULATION_MIN_SIMILARITY
+from tools.registry import registry
+
+# Words that don't change what a search returns
+FILLER_WORDS = {
+    "a", "an", "the", "of", "for", "on", "in", "to", "about", "me", "my", "i",
+    "please", "can", "could", "you", "tell", "find", "search", "look", "up",
+    "what", "whats", "is", "are", "some", "give", "show", "and", "with",
+}
+
+EXPRESSION_PATTERN = re.compile(r"[\d.(][\d.()\s]*(?:[-+*/%^][\s(]*[\d.][\d.()\s]*)+")
+
+
+def search_terms(text: str) -> set:
+    """Lowercased words of a query without punctuation and filler words."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return {word for word in words if word not in FILLER_WORDS}
+
+
+def normalize_query(message: str) -> str:
+    """The message as a search query: its meaningful words, in order."""
+    terms = search_terms(message)
+    seen = []
+    for word in re.findall(r"[a-z0-9]+", message.lower()):
+        if word in terms and word not in seen:
+            seen.append(word)
+    return " ".join(seen)
+
+
+def extract_expression(message: str) -> str:
+    """The first arithmetic expression in the message ("" if there is none)."""
+    match = EXPRESSION_PATTERN.search(message)
+    if not match:
+        return ""
+    return re.sub(r"\s+", "", match.group())
+
+
+class Speculator:
+    """
+    Starts speculative tool calls per workflow thread and hands their results
+    to matching plan steps. Counters track how often speculation pays off.
+    """
+
+    def __init__(self, enabled: bool = SPECULATION_ENABLED, max_workers: int = SPECULATION_WORKERS,
+                 min_similarity: float = SPECULATION_MIN_SIMILARITY):
+        self.enabled = enabled
+        self.min_similarity = min_similarity
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+        self._pending = {}  # thread_id -> list of (step, future)
+        self._lock = threading.Lock()
+        self.launched = 0
+        self.hits = 0
+        self.wasted = 0
+        self.cancelled = 0
+
+    def candidates(self, message: str) -> list:
+        """Plan steps the planner is likely to produce for this message."""
+        steps = []
+        expression = extract_expression(message)
+        if expression:
+            steps.append({"tool": "calculator", "input": expression})
+            message = EXPRESSION_PATTERN.sub(" ", message)
+
+        query = normalize_query(message)
+        if re.search(r"[a-z]", query):
+            steps.append({"tool": "search", "input": query})
+        return steps
+
+    def start(self, thread_id: str, message: str) -> None:
+        """Launch the speculative calls for a thread (no-op when disabled)."""
+        if not self.enabled:
+            return
+
+        started = [
+            (step, self._pool.submit(registry.invoke, step["tool"], step))
+            for step in self.candidates(message)
+        ]
+        with self._lock:
+            self._pending[thread_id] = started
+            self.launched += len(started)
+
+    def matches(self, speculated: dict, step: dict) -> bool:
+        """Whether a plan step asks for the same work as a speculated step."""
+        if speculated["tool"] != step.get("tool"):
+            return False
+        if step.get("tool") == "calculator":
+            return extract_expression(step.get("input", "")) == speculated["input"]
+
+        if self.min_similarity >= 1:
+            return normalize_query(step.get("input", "")) == speculated["input"]
+        wanted = search_terms(step.get("input", ""))
+        guessed = search_terms(speculated["input"])
+        if not wanted or not guessed:
+            return False
+        return len(wanted & guessed) / len(wanted | guessed) >= self.min_similarity
+
+    def claim(self, thread_id: str, step: dict, timeout: float = None):
+        """
+        Return the speculated result for a plan step, or None if nothing
+        matching was speculated or it failed (raised, timed out, or returned
+        one of the tool's error results), so the step runs the tool itself.
+        """
+        with self._lock:
+            pending = self._pending.get(thread_id, [])
+            for index, (speculated, future) in enumerate(pending):
+                if self.matches(speculated, step):
+                    del pending[index]
+                    break
+            else:
+                return None
+
+        spec = registry.get(speculated["tool"])
+        try:
+            result = future.result(timeout=timeout or spec.timeout)
+        except Exception:
+            self._discard(future)
+            return None
+
+        if registry.is_error(speculated["tool"], result):
+            with self._lock:
+                self.wasted += 1
+            print(f"--- ⚠️ SPECULATED {speculated['tool']} FAILED, RUNNING THE STEP ---")
+            return None
+
+        with self._lock:
+            self.hits += 1
+        print(f"--- ⚡ USING SPECULATED {speculated['tool']} RESULT ---")
+        return result
+
+    def keep_matching(self, thread_id: str, steps: list) -> None:
+        """Drop the speculations that no step of the final plan matches."""
+        with self._lock:
+            pending = self._pending.get(thread_id)
+            if not pending:
+                return
+            unused = [
+                (speculated, future) for speculated, future in pending
+                if not any(self.matches(speculated, step) for step in steps)
+            ]
+            pending[:] = [entry for entry in pending if entry not in unused]
+        for _, future in unused:
+            self._discard(future)
+
+    def finish(self, thread_id: str) -> None:
+        """Discard whatever the thread did not use."""
+        with self._lock:
+            pending = self._pending.pop(thread_id, [])
+        for _, future in pending:
+            self._discard(future)
+
+    def _discard(self, future) -> None:
+        # A call that already started still finishes (and fills the tool cache)
+        cancelled = future.cancel()
+        with self._lock:
+            if cancelled:
+                self.cancelled += 1
+            else:
+                self.wasted += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            launched = self.launched
+            return {
+                "enabled": self.enabled,
+                "launched": launched,
+                "hits": self.hits,
+                "wasted": self.wasted,
+                "cancelled": self.cancelled,
+                "hit_rate": round(self.hits / launched, 3) if launched else None,
+                "wasted_ratio": round(self.wasted / launched, 3) if launched else None,
+            }
+
+
+# Process-wide speculator used by the workflow
+speculator = Speculator()